@@ -3,15 +3,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta
 
 from app.core.database import get_db
-from app.core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.core.security import create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, HashingOverloaded, hashing_pool
 from app.schemas.user import LoginRequest, SignupRequest
 from app.crud import user as user_crud
+from app.api.dependencies import oauth2_scheme, revoke_token, token_cache
 
 router = APIRouter()
 
 @router.post("/login")
 async def login(data: LoginRequest, db: AsyncSession = Depends(get_db)):
-    user = await user_crud.verify_user_login(db, data.identifier, data.password)
+    try:
+        user = await user_crud.verify_user_login(db, data.identifier, data.password)
+    except HashingOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
     
     if not user:
         raise HTTPException(
@@ -38,4 +42,15 @@ async def signup(data: SignupRequest, db: AsyncSession = Depends(get_db)):
         user = await user_crud.create_user(db, data.name, data.email, data.password)
         return {"message": "User created", "user_id": user.user_id}
     except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+    except HashingOverloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+
+@router.post("/logout")
+async def logout(token: str = Depends(oauth2_scheme)):
+    revoke_token(token)
+    return {"message": "Logged out"}
+
+@router.get("/auth/stats")
+async def auth_stats():
+    return {"tokens": token_cache.stats(), "hashing": hashing_pool.stats()}
\ No newline at end of file
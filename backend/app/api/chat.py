@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_db, SessionLocal
 from app.api.dependencies import get_current_user_id
-from app.services.chat_agent import get_bot_response
+from app.services.chat_agent import get_bot_response, stream_bot_response, generations, memory_stats
 
 router = APIRouter()
 
@@ -17,6 +20,8 @@ async def chat_endpoint(
     db: AsyncSession = Depends(get_db),             
     user_id: int = Depends(get_current_user_id)     
 ):
+    if not generations.try_acquire(user_id):
+        raise HTTPException(status_code=429, detail="A response is already being generated. Please wait for it to finish.")
     try:
         # We pass db and user_id. 
         # The agent uses user_id as 'thread_id' to remember previous messages from this user.
@@ -30,4 +35,54 @@ async def chat_endpoint(
     except Exception as e:
         print(f"Chat API Error: {e}")
         # Return the actual error for debugging during development
-        raise HTTPException(status_code=500, detail=f"AI Service Error: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"AI Service Error: {str(e)}")
+    finally:
+        generations.release(user_id)
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(
+    req: ChatRequest,
+    request: Request,
+    user_id: int = Depends(get_current_user_id)
+):
+    """
+    Server-sent events: 'token', 'tool_start', 'tool_end', then 'done' (or 'error').
+    Disconnecting cancels the generation.
+    """
+    if not generations.try_acquire(user_id):
+        raise HTTPException(status_code=429, detail="A response is already being generated. Please wait for it to finish.")
+
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def generate():
+        # Own session: the request's dependencies are torn down before the stream ends
+        try:
+            async with SessionLocal() as db:
+                async for event in stream_bot_response(req.prompt, db, user_id):
+                    queue.put_nowait(event)
+        finally:
+            queue.put_nowait(None)
+
+    # The slot is freed when the graph stops, however the stream ends
+    task = asyncio.create_task(generate())
+    task.add_done_callback(lambda _: generations.release(user_id))
+
+    async def event_stream():
+        try:
+            while True:
+                event = await queue.get()
+                if event is None or await request.is_disconnected():
+                    break
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+        finally:
+            task.cancel()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/chat/stats")
+async def chat_stats():
+    return memory_stats()
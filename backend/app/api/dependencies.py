@@ -1,24 +1,94 @@
+import hashlib
+import time
+from typing import Dict
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt, JWTError
-from app.core.security import SECRET_KEY, ALGORITHM
+from app.core.cache import TTLCache
+from app.core.config import TOKEN_CACHE_SIZE
+from app.core.security import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/login")
 
-async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
-    credentials_exception = HTTPException(
+# ------------------ VERIFIED TOKEN CACHE ------------------
+class TokenCache:
+    """
+    Tokens that already passed jwt.decode, keyed by their SHA-256 digest (the token itself
+    is never stored) -> (user_id, exp). An entry never outlives its token's exp, so a
+    cached token expires exactly when a decoded one would. Revoked digests are kept until
+    their exp and checked before the cache, whatever the LRU has evicted.
+    """
+
+    def __init__(self, maxsize: int = TOKEN_CACHE_SIZE):
+        self.verified = TTLCache(maxsize=maxsize, ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+        self.revoked: Dict[bytes, float] = {}
+        self.revocations = 0
+
+    @staticmethod
+    def digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes):
+        entry = self.verified.get(key)
+        return None if entry is None else entry[0]
+
+    def add(self, key: bytes, user_id, exp: float | None):
+        ttl = None if exp is None else exp - time.time()
+        if ttl is None or ttl > 0:
+            self.verified.set(key, (user_id, exp), ttl=ttl)
+
+    def is_revoked(self, key: bytes) -> bool:
+        return key in self.revoked
+
+    def revoke(self, key: bytes, exp: float | None):
+        """Denies the token until its exp; expired denials are dropped on the way"""
+        now = time.time()
+        for expired in [k for k, until in self.revoked.items() if until < now]:
+            del self.revoked[expired]
+        self.revoked[key] = exp if exp is not None else now + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        self.verified.invalidate(key)
+        self.revocations += 1
+
+    def stats(self) -> dict:
+        return {**self.verified.stats(), "revoked": len(self.revoked), "revocations": self.revocations}
+
+token_cache = TokenCache()
+
+def credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_token(token: str) -> dict:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
+    except (JWTError, ValueError):
+        raise credentials_exception()
+    if payload.get("sub") is None:
+        raise credentials_exception()
+    return payload
 
+async def get_current_user_id(token: str = Depends(oauth2_scheme)) -> int:
+    key = token_cache.digest(token)
+    if token_cache.is_revoked(key):
+        raise credentials_exception()
+
+    user_id = token_cache.get(key)
+    if user_id is not None:
         return user_id
 
-    except(JWTError, ValueError):
-        raise credentials_exception
+    payload = decode_token(token)
+    # "sub" is a string claim; every cache and index downstream is keyed by the int id
+    try:
+        user_id = int(payload["sub"])
+    except (TypeError, ValueError):
+        raise credentials_exception()
+    token_cache.add(key, user_id, payload.get("exp"))
+    return user_id
 
+def revoke_token(token: str):
+    """Logout hook: the token is refused from now on, even if it is still cached"""
+    payload = decode_token(token)
+    token_cache.revoke(token_cache.digest(token), payload.get("exp"))
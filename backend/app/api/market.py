@@ -0,0 +1,21 @@
+import time
+from fastapi import APIRouter, HTTPException
+
+from app.services.tick_history import tick_history, INTERVALS
+from app.services.market_data import history_store
+
+router = APIRouter()
+
+@router.get("/candles/{stock_id}")
+async def get_candles(stock_id: int, interval: str = "1m"):
+    if interval not in INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Interval must be one of {', '.join(INTERVALS)}")
+    return {
+        "stock_id": stock_id,
+        "interval": interval,
+        "candles": tick_history.candles(stock_id, interval, time.time())
+    }
+
+@router.get("/history/stats")
+async def history_stats():
+    return history_store.stats()
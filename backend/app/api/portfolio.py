@@ -1,3 +1,4 @@
+import json
 from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
@@ -5,17 +6,24 @@ from typing import List
 from app.core.database import get_db
 from app.crud import portfolio as portfolio_crud
 from app.crud import trigger as trigger_crud
-from app.schemas.portfolio import PortfolioItem, TradeRequest, TriggerRequest
+from app.core.config import ORDER_BATCH_MAX_LEGS
+from app.schemas.portfolio import PortfolioItem, TradeRequest, TriggerRequest, BatchOrderRequest
 from app.api.dependencies import get_current_user_id 
 # Note: "scraper_service" alias helps avoid confusion with the API file name
 from app.services import scraper_engine as scraper_service 
 from app.services.trigger import add_to_trigger_cache
+from app.services.wire_format import WireFormat
 
 router = APIRouter()
 
+@router.get("/cache/stats")
+async def portfolio_cache_stats():
+    return portfolio_crud.portfolio_cache.stats()
+
 @router.get("/{user_id}", response_model=List[PortfolioItem])
 async def get_portfolio(user_id: int, db: AsyncSession = Depends(get_db)):
-    items = await portfolio_crud.get_portfolio_by_user(db, user_id)
+    # Holdings come from the read-through cache; live prices are overlaid below on every request
+    items = await portfolio_crud.get_cached_portfolio(db, user_id)
     response = []
     
     for item in items:
@@ -59,6 +67,32 @@ async def sell_stock(req: TradeRequest, user_id: int = Depends(get_current_user_
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     
+@router.post("/orders/batch")
+async def batch_orders(req: BatchOrderRequest, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
+    # Legs run in the given order, so a basket can sell one stock and buy another with the proceeds
+    if req.mode not in ("all_or_nothing", "best_effort"):
+        raise HTTPException(status_code=400, detail="Mode must be all_or_nothing or best_effort")
+    if not 1 <= len(req.orders) <= ORDER_BATCH_MAX_LEGS:
+        raise HTTPException(status_code=400, detail=f"A batch takes 1 to {ORDER_BATCH_MAX_LEGS} orders")
+    for i, leg in enumerate(req.orders):
+        if leg.quantity < 1 or leg.price <= 0 or leg.order_type not in ("B", "S"):
+            raise HTTPException(status_code=400, detail=f"Order {i}: quantity and price must be positive, order_type B or S")
+
+    executed, rejected = await portfolio_crud.execute_order_batch(
+        db, user_id,
+        [(leg.stock_id, leg.quantity, leg.price, leg.order_type) for leg in req.orders],
+        all_or_nothing=req.mode == "all_or_nothing"
+    )
+    if rejected and req.mode == "all_or_nothing":
+        raise HTTPException(status_code=400, detail={
+            "message": "Insufficient holdings, no order executed",
+            "rejected": [{"index": i, "stock_id": req.orders[i].stock_id} for i in rejected]
+        })
+    return {
+        "executed": len(executed),
+        "rejected": [{"index": i, "stock_id": req.orders[i].stock_id, "reason": "Insufficient holdings"} for i in rejected]
+    }
+
 @router.post("/trigger")
 async def set_trigger_order(req: TriggerRequest, user_id: int = Depends(get_current_user_id), db: AsyncSession = Depends(get_db)):
     try:
@@ -92,10 +126,29 @@ async def set_trigger_order(req: TriggerRequest, user_id: int = Depends(get_curr
 #         scraper_service.manager.disconnect(websocket)
 
 @router.websocket("/ws/market")
-async def portfolio_websocket(websocket: WebSocket, user_id: int = None):
-    await scraper_service.manager.connect(websocket, user_id)
+async def portfolio_websocket(websocket: WebSocket, token: str = None, encoding: str = "json", compress: str = None):
+    # encoding: json | msgpack | columnar, compress: deflate. Anything else falls back to plain JSON text.
+    wire = WireFormat(encoding, compress)
+    # The private channel (fills, P&L) belongs to whoever holds a valid access token: ?token=
+    # (browsers cannot set headers on a WebSocket) or an Authorization header. Without one
+    # the socket only gets the public market feed.
+    user_id = None
+    authorization = websocket.headers.get("authorization", "")
+    token = token or (authorization[7:] if authorization.lower().startswith("bearer ") else None)
+    if token:
+        try:
+            user_id = await get_current_user_id(token)
+        except HTTPException:
+            await websocket.close(code=1008)
+            return
+    await scraper_service.manager.connect(websocket, user_id, wire)
     try:
         while True:
-            await websocket.receive_text()
+            try:
+                message = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            # subscribe / unsubscribe / resync
+            scraper_service.manager.handle_message(websocket, message)
     except WebSocketDisconnect:
         scraper_service.manager.disconnect(websocket, user_id)
\ No newline at end of file
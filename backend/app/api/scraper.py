@@ -1,6 +1,9 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 import asyncio
+from app.core.database import get_db
 from app.services import scraper_engine as scraper_service
+from app.services.tick_history import tick_history
 
 router = APIRouter()
 
@@ -17,4 +20,24 @@ async def stop_scraper():
     if not scraper_service.SCRAPER_RUNNING:
         return {"message": "Scraper is not running."}
     scraper_service.SCRAPER_RUNNING = False
-    return {"message": "Scraper stopped."}
\ No newline at end of file
+    return {"message": "Scraper stopped."}
+
+@router.get("/stats")
+async def scraper_stats():
+    return {
+        "running": scraper_service.SCRAPER_RUNNING,
+        "source": scraper_service.PRICE_SOURCE.stats(),
+        "websockets": scraper_service.manager.stats(),
+        "scheduler": scraper_service.SCHEDULER.stats(len(scraper_service.TICKERS)),
+        "universe": {
+            "tickers": len(scraper_service.TICKERS),
+            "quoted": len(scraper_service.CACHE),
+            "price_table_bytes": scraper_service.CACHE.memory_bytes(),
+            "tick_history_bytes": tick_history.memory_bytes(),
+        }
+    }
+
+@router.post("/universe/reload")
+async def reload_universe(db: AsyncSession = Depends(get_db)):
+    count = await scraper_service.load_universe(db)
+    return {"message": f"Tracking {count} tickers."}
@@ -8,7 +8,91 @@ DB_PORT = os.getenv("DB_PORT")
 DB_USERNAME = os.getenv("DB_USERNAME")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_DATABASE = os.getenv("DB_DATABASE")
+# Full SQLAlchemy URL; overrides the DB_* settings when set (e.g. a local SQLite for replays)
+DATABASE_URL = os.getenv("DATABASE_URL")
+
+# Root for files the backend writes (tick logs, previous-close store); relative paths
+# below resolve against it, not against the working directory
+DATA_DIR = os.getenv("DATA_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data"))
 
 SSL_CA_PATH = os.getenv("SSL_CA_PATH")
 SSL_VERIFY_CERT = os.getenv("SSL_VERIFY_CERT")
-SSL_VERIFY_IDENTITY = os.getenv("SSL_VERIFY_IDENTITY")
\ No newline at end of file
+SSL_VERIFY_IDENTITY = os.getenv("SSL_VERIFY_IDENTITY")
+
+# Password hashing (argon2id). Changing these rehashes each password on its next login.
+ARGON2_ROUNDS = int(os.getenv("ARGON2_ROUNDS", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+# Hashing worker processes, and hash calls allowed to wait or run before new ones get a 503
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+HASH_MAX_PENDING = int(os.getenv("HASH_MAX_PENDING", "64"))
+# Verified access tokens remembered per process, so repeat requests skip the JWT decode
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# Scraper HTTP client
+SCRAPER_BASE_URL = os.getenv("SCRAPER_BASE_URL", "https://www.google.com/finance/quote")
+# Adaptive (AIMD) in-flight request limit: starts at INITIAL, moves between MIN and MAX
+SCRAPER_MAX_CONCURRENCY = int(os.getenv("SCRAPER_MAX_CONCURRENCY", "32"))
+SCRAPER_MIN_CONCURRENCY = int(os.getenv("SCRAPER_MIN_CONCURRENCY", "2"))
+SCRAPER_INITIAL_CONCURRENCY = int(os.getenv("SCRAPER_INITIAL_CONCURRENCY", "10"))
+SCRAPER_TIMEOUT = float(os.getenv("SCRAPER_TIMEOUT", "5"))
+SCRAPER_EXTRACTOR = os.getenv("SCRAPER_EXTRACTOR", "find")
+# Retries on 429/5xx/timeouts (jittered exponential backoff), all within one cycle's deadline
+SCRAPER_RETRIES = int(os.getenv("SCRAPER_RETRIES", "2"))
+SCRAPER_RETRY_BACKOFF = float(os.getenv("SCRAPER_RETRY_BACKOFF", "0.25"))
+SCRAPER_CYCLE_DEADLINE = float(os.getenv("SCRAPER_CYCLE_DEADLINE", "5"))
+# Per-host circuit breaker: open after this many overloads in a row, probe again after the reset
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("BREAKER_RESET_SECONDS", "30"))
+# Poll interval in seconds for active tickers, and the longest back-off for quiet ones
+SCRAPER_INTERVAL = float(os.getenv("SCRAPER_INTERVAL", "2"))
+SCRAPER_MAX_INTERVAL = float(os.getenv("SCRAPER_MAX_INTERVAL", "30"))
+# Most tickers requested in one cycle; due tickers beyond it rotate into later cycles. 0 = no cap.
+SCRAPER_CYCLE_BUDGET = int(os.getenv("SCRAPER_CYCLE_BUDGET", "200"))
+
+# Price feeds in failover order: any of google, yfinance, simulated (e.g. "google,yfinance")
+PRICE_SOURCES = os.getenv("PRICE_SOURCES", "google")
+# Simulated feed: random walk by default, or cycle through a recorded tick log day (YYYY-MM-DD)
+SIMULATED_SEED = int(os.getenv("SIMULATED_SEED", "7"))
+SIMULATED_VOLATILITY = float(os.getenv("SIMULATED_VOLATILITY", "0.001"))
+SIMULATED_REPLAY_DAY = os.getenv("SIMULATED_REPLAY_DAY")
+
+# Intraday tick history: ticks kept per stock (~6h15m session at 2s = 11250 ticks, 12 bytes each)
+TICK_HISTORY_CAPACITY = int(os.getenv("TICK_HISTORY_CAPACITY", "12000"))
+
+# Append-only binary tick log, one file per trading day. Off unless TICK_LOG_ENABLED; the
+# directory is relative to DATA_DIR, and days older than the retention are deleted (0 keeps all).
+TICK_LOG_ENABLED = os.getenv("TICK_LOG_ENABLED", "false").lower() in ("1", "true", "yes")
+TICK_LOG_DIR = os.path.join(DATA_DIR, os.getenv("TICK_LOG_DIR", "tick_logs"))
+TICK_LOG_RETENTION_DAYS = int(os.getenv("TICK_LOG_RETENTION_DAYS", "30"))
+
+# Per-user holdings cache in front of the Portfolio table
+PORTFOLIO_CACHE_SIZE = int(os.getenv("PORTFOLIO_CACHE_SIZE", "10000"))
+PORTFOLIO_CACHE_TTL = float(os.getenv("PORTFOLIO_CACHE_TTL", "300"))
+# Most legs accepted in one /orders/batch request
+ORDER_BATCH_MAX_LEGS = int(os.getenv("ORDER_BATCH_MAX_LEGS", "200"))
+
+# Concurrent chat generations per user (all of a user's chats share one conversation thread)
+CHAT_MAX_ACTIVE_PER_USER = int(os.getenv("CHAT_MAX_ACTIVE_PER_USER", "1"))
+
+# Chat memory: questions kept per thread, tool output kept once answered, idle thread eviction
+CHAT_HISTORY_TURNS = int(os.getenv("CHAT_HISTORY_TURNS", "6"))
+CHAT_TOOL_PAYLOAD_CHARS = int(os.getenv("CHAT_TOOL_PAYLOAD_CHARS", "400"))
+CHAT_MAX_THREADS = int(os.getenv("CHAT_MAX_THREADS", "5000"))
+CHAT_THREAD_TTL = float(os.getenv("CHAT_THREAD_TTL", "86400"))
+# SQLite file for chat memory (needs langgraph-checkpoint-sqlite); unset keeps it in RAM
+CHAT_MEMORY_DB = os.getenv("CHAT_MEMORY_DB")
+
+# Chat tool execution: dedicated threads for blocking calls, tool calls in flight across all chats,
+# default timeout per call (see TOOL_TIMEOUTS for per-tool values)
+CHAT_TOOL_WORKERS = int(os.getenv("CHAT_TOOL_WORKERS", "8"))
+CHAT_TOOL_CONCURRENCY = int(os.getenv("CHAT_TOOL_CONCURRENCY", "32"))
+CHAT_TOOL_TIMEOUT = float(os.getenv("CHAT_TOOL_TIMEOUT", "10"))
+
+# Chat tools: 5-day hourly history per ticker, shared across users
+MARKET_HISTORY_TTL = float(os.getenv("MARKET_HISTORY_TTL", "300"))
+MARKET_HISTORY_CACHE_SIZE = int(os.getenv("MARKET_HISTORY_CACHE_SIZE", "500"))
+
+# Previous-close store and trading calendar
+PREV_CLOSE_STORE = os.path.join(DATA_DIR, os.getenv("PREV_CLOSE_STORE", "prev_close.json"))
+NSE_HOLIDAYS_FILE = os.getenv("NSE_HOLIDAYS_FILE")
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from app.core.config import DB_HOST, DB_PORT, DB_USERNAME, DB_PASSWORD, DB_DATABASE, SSL_CA_PATH
+from app.core.config import DB_HOST, DB_PORT, DB_USERNAME, DB_PASSWORD, DB_DATABASE, DATABASE_URL, SSL_CA_PATH
 import ssl
 
 connect_args = {}
@@ -8,7 +8,7 @@ if SSL_CA_PATH:
     ssl_ctx.verify_mode = ssl.CERT_REQUIRED
     connect_args["ssl"] = ssl_ctx
 
-DB_URL = f"mysql+aiomysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}"
+DB_URL = DATABASE_URL or f"mysql+aiomysql://{DB_USERNAME}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_DATABASE}"
 
 engine = create_async_engine(
     DB_URL,
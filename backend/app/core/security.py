@@ -1,13 +1,26 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime, timedelta
 from typing import Union
 from jose import jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from app.core.config import (
+    ARGON2_ROUNDS, ARGON2_MEMORY_COST, ARGON2_PARALLELISM, HASH_WORKERS, HASH_MAX_PENDING
+)
 
 load_dotenv()
 
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
+# Hashes made with other parameters still verify; needs_update() flags them for a rehash
+pwd_context = CryptContext(
+    schemes=["argon2"], deprecated="auto",
+    argon2__rounds=ARGON2_ROUNDS,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM
+)
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
@@ -18,6 +31,90 @@ def hash_password(password: str) -> str:
 def verify_password_hash(password: str, hashed: str) -> bool:
     return pwd_context.verify(password, hashed)
 
+def verify_and_update_hash(password: str, hashed: str) -> tuple[bool, str | None]:
+    """(valid, new hash if the stored one uses outdated parameters)"""
+    return pwd_context.verify_and_update(password, hashed)
+
+# Never fork the multithreaded server; forkserver is POSIX only
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+# ------------------ HASHING POOL ------------------
+class HashingOverloaded(Exception):
+    pass
+
+class HashingPool:
+    """
+    Runs argon2 in worker processes: each hash takes ~0.2s of CPU and 64 MB, which on the
+    event loop would stall the scraper and every socket for the duration. At most
+    max_pending calls may wait or run; beyond that callers get HashingOverloaded (503)
+    instead of an ever-growing queue during login bursts. Workers come from a forkserver
+    (spawn where there is none, e.g. Windows), not a fork of the (multithreaded) server
+    process; if one dies (e.g. OOM-killed) the pool is rebuilt and the call retried once.
+    """
+
+    def __init__(self, workers: int = HASH_WORKERS, max_pending: int = HASH_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor: ProcessPoolExecutor | None = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.restarts = 0
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HashingOverloaded("Too many logins in progress, please retry shortly")
+        self.pending += 1
+        try:
+            executor = self._executor()
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                self._rebuild(executor)
+                result = await asyncio.get_running_loop().run_in_executor(self._executor(), func, *args)
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return result
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD)
+            )
+        return self.executor
+
+    def _rebuild(self, broken: ProcessPoolExecutor):
+        # Concurrent callers all see the same broken pool; only the first replaces it
+        if self.executor is broken:
+            print("Hashing pool broke (a worker died), starting a new one")
+            self.restarts += 1
+            self.shutdown()
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password, password)
+
+    async def verify_and_update(self, password: str, hashed: str) -> tuple[bool, str | None]:
+        return await self.run(verify_and_update_hash, password, hashed)
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "restarts": self.restarts,
+        }
+
+hashing_pool = HashingPool()
+
 def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None):
     if not SECRET_KEY:
         raise ValueError("No SECRET_KEY found.")
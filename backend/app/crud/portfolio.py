@@ -1,8 +1,21 @@
 from sqlalchemy.future import select
+from sqlalchemy import tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from collections import namedtuple
 from datetime import datetime
 from zoneinfo import ZoneInfo
-from app.models.sql_models import Portfolio, Transaction
+from app.core.cache import TTLCache
+from app.core.config import PORTFOLIO_CACHE_SIZE, PORTFOLIO_CACHE_TTL
+from app.models.sql_models import Portfolio, Transaction, OrderTrigger
+from app.services.holdings import holdings_index
+
+# Detached, immutable copy of a Portfolio row as served from the cache
+HoldingRow = namedtuple("HoldingRow", ["stock_id", "quantity", "buy_price"])
+# One leg of a batch order, shaped like an OrderTrigger for the shared fill code
+OrderLeg = namedtuple("OrderLeg", ["user_id", "stock_id", "quantity", "order_type"])
+
+# user_id -> tuple of HoldingRow. Every write path below invalidates its user.
+portfolio_cache = TTLCache(maxsize=PORTFOLIO_CACHE_SIZE, ttl=PORTFOLIO_CACHE_TTL)
 
 def get_ist_time():
     return datetime.now(ZoneInfo("Asia/Kolkata"))
@@ -11,6 +24,16 @@ async def get_portfolio_by_user(db: AsyncSession, user_id: int):
     result = await db.execute(select(Portfolio).where(Portfolio.user_id == user_id))
     return result.scalars().all()
 
+async def get_cached_portfolio(db: AsyncSession, user_id: int):
+    """Read-through version of get_portfolio_by_user; holdings only change on buy/sell/trigger fills"""
+    holdings = portfolio_cache.get(user_id)
+    if holdings is None:
+        generation = portfolio_cache.generation()
+        items = await get_portfolio_by_user(db, user_id)
+        holdings = tuple(HoldingRow(item.stock_id, item.quantity, float(item.buy_price)) for item in items)
+        portfolio_cache.set(user_id, holdings, generation)
+    return holdings
+
 async def buy_stock(db: AsyncSession, user_id: int, stock_id: int, quantity: int, price: float):
     result = await db.execute(
         select(Portfolio)
@@ -39,6 +62,8 @@ async def buy_stock(db: AsyncSession, user_id: int, stock_id: int, quantity: int
     )
     db.add(tx)
     await db.commit()
+    portfolio_cache.invalidate(user_id)
+    holdings_index.set_holding(user_id, stock_id, existing.quantity, existing.buy_price)
     return existing
 
 async def sell_stock(db: AsyncSession, user_id: int, stock_id: int, quantity: int, price: float):
@@ -62,4 +87,135 @@ async def sell_stock(db: AsyncSession, user_id: int, stock_id: int, quantity: in
     )
     db.add(tx)
     await db.commit()
-    return True
\ No newline at end of file
+    portfolio_cache.invalidate(user_id)
+    holdings_index.set_holding(user_id, stock_id, existing.quantity, existing.buy_price)
+    return True
+
+async def _lock_and_apply(db: AsyncSession, fills: list, now):
+    """
+    Locks every Portfolio row the fills touch with a single ordered SELECT ... FOR UPDATE
+    (same lock order everywhere, so concurrent batches cannot deadlock) and applies the
+    quantity/average-price math in memory, in list order.
+    fills is a list of (order, price); order needs user_id, stock_id, quantity, order_type.
+    Returns (holdings, new_keys, executed, rejected); nothing is written yet.
+    """
+    keys = sorted({(order.user_id, order.stock_id) for order, _ in fills})
+    result = await db.execute(
+        select(Portfolio)
+        .where(tuple_(Portfolio.user_id, Portfolio.stock_id).in_(keys))
+        .order_by(Portfolio.user_id, Portfolio.stock_id)
+        .with_for_update()
+    )
+    holdings = {(row.user_id, row.stock_id): row for row in result.scalars().all()}
+    new_keys = set()
+
+    executed, rejected = [], []
+    for order, price in fills:
+        key = (order.user_id, order.stock_id)
+        existing = holdings.get(key)
+
+        if order.order_type == "B":
+            if existing is None:
+                existing = Portfolio(
+                    user_id=order.user_id, stock_id=order.stock_id, quantity=0,
+                    buy_price=price, purchase_date=now
+                )
+                holdings[key] = existing
+                new_keys.add(key)
+            old_val = float(existing.quantity) * float(existing.buy_price)
+            new_val = float(order.quantity) * float(price)
+            total_qty = existing.quantity + order.quantity
+            existing.buy_price = (old_val + new_val) / total_qty
+            existing.quantity = total_qty
+            existing.purchase_date = now
+        else:
+            if not existing or existing.quantity < order.quantity:
+                rejected.append((order, price))
+                continue
+            existing.quantity -= order.quantity
+
+        executed.append((order, price))
+    return holdings, new_keys, executed, rejected
+
+async def _stage_fills(db: AsyncSession, holdings: dict, new_keys: set, executed: list, now):
+    """Adds new and deletes emptied Portfolio rows and bulk-adds the executed Transactions"""
+    for key, row in holdings.items():
+        if key in new_keys:
+            if row.quantity > 0:
+                db.add(row)
+        elif row.quantity == 0:
+            await db.delete(row)
+
+    db.add_all([
+        Transaction(
+            user_id=order.user_id, stock_id=order.stock_id, quantity=order.quantity,
+            price=price, transaction_type=order.order_type, transaction_date=now
+        )
+        for order, price in executed
+    ])
+
+def _publish_holdings(holdings: dict):
+    for (user_id, stock_id), row in holdings.items():
+        portfolio_cache.invalidate(user_id)
+        holdings_index.set_holding(user_id, stock_id, row.quantity, row.buy_price)
+
+async def execute_trigger_batch(db: AsyncSession, fills: list):
+    """
+    Executes a tick's fired trigger orders in one transaction.
+    fills is a list of (OrderTrigger, price). All affected Portfolio rows are locked
+    with a single SELECT ... FOR UPDATE, the quantity/average-price math runs in memory,
+    and Transactions plus OrderTriggers status changes go out with one commit.
+    Returns (executed, rejected); a rejected order (insufficient holdings) is marked 'R'
+    in the same commit and does not affect the rest of the batch.
+    """
+    if not fills:
+        return [], []
+
+    now = get_ist_time()
+    holdings, new_keys, executed, rejected = await _lock_and_apply(db, fills, now)
+    await _stage_fills(db, holdings, new_keys, executed, now)
+    if executed:
+        await db.execute(
+            update(OrderTrigger)
+            .where(OrderTrigger.trigger_id.in_([order.trigger_id for order, _ in executed]))
+            .values(status="E")
+            .execution_options(synchronize_session=False)
+        )
+    if rejected:
+        await db.execute(
+            update(OrderTrigger)
+            .where(OrderTrigger.trigger_id.in_([order.trigger_id for order, _ in rejected]))
+            .values(status="R")
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+    _publish_holdings(holdings)
+    for order, _ in executed:
+        order.status = "E"
+    for order, _ in rejected:
+        order.status = "R"
+    return executed, rejected
+
+async def execute_order_batch(db: AsyncSession, user_id: int, legs: list, all_or_nothing: bool = True):
+    """
+    Executes a basket of a user's buys and sells in one transaction, in the given order.
+    legs is a list of (stock_id, quantity, price, order_type). Same locking and math as
+    execute_trigger_batch. Returns (executed, rejected) as lists of leg indexes; with
+    all_or_nothing any rejected leg rolls back the whole basket, so executed is empty.
+    """
+    fills = [(OrderLeg(user_id, stock_id, quantity, order_type), price) for stock_id, quantity, price, order_type in legs]
+    index = {id(order): i for i, (order, _) in enumerate(fills)}
+
+    now = get_ist_time()
+    holdings, new_keys, executed, rejected = await _lock_and_apply(db, fills, now)
+    rejected = [index[id(order)] for order, _ in rejected]
+    if not executed or (all_or_nothing and rejected):
+        await db.rollback()
+        return [], rejected
+
+    await _stage_fills(db, holdings, new_keys, executed, now)
+    await db.commit()
+
+    _publish_holdings(holdings)
+    return [index[id(order)] for order, _ in executed], rejected
@@ -1,7 +1,7 @@
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.sql_models import User
-from app.core.security import hash_password, verify_password_hash
+from app.core.security import hashing_pool
 
 # User is CLASS which is in sql_model
 async def get_user_by_id(db: AsyncSession, user_id: int):
@@ -20,7 +20,7 @@ async def create_user(db: AsyncSession, name: str, email: str, password: str):
     user = User(
         name=name,
         email=email,
-        password_hash=hash_password(password)
+        password_hash=await hashing_pool.hash(password)
     )
     db.add(user)
     await db.commit()
@@ -39,6 +39,11 @@ async def verify_user_login(db: AsyncSession, identifier: str, password: str):
         user = await get_user_by_id(db, user_id)
     if not user:
         return None
-    if not verify_password_hash(password, user.password_hash):
+    valid, new_hash = await hashing_pool.verify_and_update(password, user.password_hash)
+    if not valid:
         return None
+    if new_hash:
+        # Stored with older parameters: upgrade it while we have the plaintext
+        user.password_hash = new_hash
+        await db.commit()
     return user
\ No newline at end of file
@@ -41,7 +41,8 @@ class Portfolio(Base):
 class Transaction(Base):
     __tablename__ = "Transactions"
 
-    transaction_id = Column(BigInteger, primary_key=True, autoincrement=True)
+    # SQLite only autoincrements INTEGER primary keys (local replay database)
+    transaction_id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
     user_id = Column(Integer, ForeignKey("Users.user_id"), nullable=False)
     stock_id = Column(Integer, nullable=False)
     quantity = Column(Integer, nullable=False)
@@ -61,7 +62,7 @@ class OrderTrigger(Base):
     target_price = Column(Float(15, 2), nullable=False)
     # B: Buy, S: Sell
     order_type = Column(String(1), nullable=False) 
-    # P: Pending, E: Executed, C: Canceled
+    # P: Pending, E: Executed, C: Canceled, R: Rejected (insufficient holdings when it fired)
     status = Column(String(1), default="P") 
     created_at = Column(DateTime, default=lambda: datetime.now(IST))
 
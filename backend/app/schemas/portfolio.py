@@ -1,4 +1,5 @@
 from pydantic import BaseModel
+from typing import List
 
 class PortfolioItem(BaseModel):
     stock_id: int
@@ -20,4 +21,16 @@ class TriggerRequest(BaseModel):
     stock_id: int
     quantity: int
     target_price: float
-    order_type: str 
\ No newline at end of file
+    order_type: str
+
+class OrderLegRequest(BaseModel):
+    stock_id: int
+    quantity: int
+    price: float
+    # B: Buy, S: Sell
+    order_type: str
+
+class BatchOrderRequest(BaseModel):
+    orders: List[OrderLegRequest]
+    # all_or_nothing: any failing leg cancels the basket; best_effort: the rest still executes
+    mode: str = "all_or_nothing"
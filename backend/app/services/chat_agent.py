@@ -1,19 +1,21 @@
 import os
 import json
-import yfinance as yf
-from typing import Annotated, Literal, TypedDict
+from typing import Annotated, AsyncIterator, Dict, Literal, TypedDict
 from langchain_groq import ChatGroq
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage, SystemMessage, ToolMessage
 from langgraph.graph import END, StateGraph, START
 from langgraph.graph.message import add_messages
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import ToolNode
 from langchain_core.runnables import RunnableConfig
 
 # Import your existing CRUD and Services
 from app.services import scraper_engine
+from app.services.market_data import history_store, live_price, normalize_ticker
+from app.services.tool_pool import tool_pool, ToolTimeout
 from app.crud import portfolio as portfolio_crud
+from app.services.chat_memory import BoundedMemorySaver, open_checkpointer, compact_messages, prompt_stats
+from app.core.config import CHAT_MAX_ACTIVE_PER_USER
 
 # --- Configuration ---
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
@@ -28,50 +30,61 @@ llm = ChatGroq(
 
 # --- 1. Define Tools ---
 
+def format_quote(ticker: str, history, live: float | None) -> str:
+    if not history and live is None:
+        return f"No data found for {ticker}."
+
+    current_price = live if live is not None else history[-1][1]
+    lines = [f"**{ticker}** Price: **₹{round(current_price, 2)}**"]
+    if history:
+        start_price = history[0][1]
+        growth = ((current_price - start_price) / start_price) * 100
+        lines.append(f"5-Day Growth: **{round(growth, 2)}%**")
+        lines.append("Recent Points:\n" + "\n".join(f"{label}: ₹{close}" for label, close in history[-5:]))
+    return "\n".join(lines)
+
 @tool
-def get_stock_price(ticker: str):
+async def get_stock_price(ticker: str):
     """
     Fetches latest price and 5-day history. Handles .NS automatically.
-    Use for price and growth percentage questions.
+    Use for price and growth percentage questions. Pass several tickers
+    separated by commas (e.g. "TCS, INFY") to compare them in one call.
     """
     try:
-        ticker_clean = ticker.upper().replace(".NS", "")
-        yf_ticker = f"{ticker_clean}.NS"
-        stock = yf.Ticker(yf_ticker)
-        
-        hist = stock.history(period="5d", interval="60m")
-        if hist.empty:
-            return f"No data found for {ticker_clean}."
-
-        current_price = hist['Close'].iloc[-1]
-        start_price = hist['Close'].iloc[0]
-        growth = ((current_price - start_price) / start_price) * 100
-        
-        history_str = [f"{idx.strftime('%m-%d %H:%M')}: ₹{round(row['Close'], 2)}" 
-                       for idx, row in hist.tail(5).iterrows()]
-        
-        return (f"**{ticker_clean}** Price: **₹{round(current_price, 2)}**\n"
-                f"5-Day Growth: **{round(growth, 2)}%**\n"
-                f"Recent Points:\n" + "\n".join(history_str))
+        tickers = [normalize_ticker(t) for t in ticker.split(",") if t.strip()]
+        # Live price from the scraper, 5-day history from the shared TTL cache
+        histories = await tool_pool.run("get_stock_price", lambda: history_store.get(tickers))
+        return "\n\n".join(format_quote(t, histories.get(t, ()), live_price(t)) for t in tickers)
     except Exception as e:
         return f"Error: {str(e)}"
 
+news_client = None
+
+def get_news_client():
+    """One async Tavily client for all chats, so its connection pool is reused"""
+    global news_client
+    if news_client is None:
+        from tavily import AsyncTavilyClient
+        news_client = AsyncTavilyClient(api_key=TAVILY_API_KEY)
+    return news_client
+
 @tool
-def get_market_news(query: str):
+async def get_market_news(query: str):
     """
     Searches news and extracts content. Use for 'Why' or 'Reason' questions.
     """
-    from tavily import TavilyClient
-    tavily = TavilyClient(api_key=TAVILY_API_KEY)
     try:
+        tavily = get_news_client()
         # include_raw_content=True fixes the "News Error" loop
-        response = tavily.search(query=query, search_depth="advanced", max_results=2, include_raw_content=True)
+        response = await tool_pool.run("get_market_news", lambda: tavily.search(
+            query=query, search_depth="advanced", max_results=2, include_raw_content=True
+        ))
         results = response.get('results', [])
         if not results: return "No news found."
 
         news_text = ""
         for n in results:
-            body = n.get('raw_content', n.get('content', ''))[:800]
+            body = (n.get('raw_content') or n.get('content', ''))[:800]
             news_text += f"### {n['title']}\n{body}\nSource: {n['url']}\n\n"
         
         return news_text
@@ -85,7 +98,10 @@ async def check_my_portfolio(config: RunnableConfig):
     user_id = config["configurable"].get("user_id")
     if not db or not user_id: return "Error: No session."
 
-    items = await portfolio_crud.get_portfolio_by_user(db, user_id)
+    try:
+        items = await tool_pool.run("check_my_portfolio", lambda: portfolio_crud.get_cached_portfolio(db, user_id))
+    except ToolTimeout as e:
+        return f"Error: {e}"
     if not items: return "Your portfolio is empty."
 
     report = "User Portfolio:\n"
@@ -104,37 +120,91 @@ tool_node = ToolNode(tools)
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
 
-def agent(state: AgentState):
-    # Bind tools to the model inside the node
-    model = llm.bind_tools(tools)
-    return {"messages": [model.invoke(state["messages"])]}
+SYSTEM_PROMPT = SystemMessage(content="""
+    You are a AI stock platform assistant. 
+    1. For current price, use 'get_stock_price'. 
+    2. For 'why','will stock price increase or decrease','growth' use 'get_market_news'. 
+    3. Always give a final answer after tool use.
+    """)
+
+# Bound once; binding per step rebuilt the tool schemas on every call
+model = llm.bind_tools(tools)
+
+async def agent(state: AgentState):
+    # The system prompt is added per call rather than stored in every turn of the thread
+    response = await model.ainvoke([SYSTEM_PROMPT] + state["messages"])
+    usage = getattr(response, "usage_metadata", None) or {}
+    prompt_stats.record(len(state["messages"]) + 1, usage.get("input_tokens", 0))
+    return {"messages": [response]}
+
+def compact(state: AgentState):
+    """End of a turn: window the thread and shrink tool output that has been answered from"""
+    return {"messages": compact_messages(state["messages"])}
 
 def should_continue(state: AgentState):
     last_message = state["messages"][-1]
     if last_message.tool_calls:
         return "tools"
-    return END
+    return "compact"
 
 workflow = StateGraph(AgentState)
 workflow.add_node("agent", agent)
 workflow.add_node("tools", tool_node)
+workflow.add_node("compact", compact)
 
 workflow.add_edge(START, "agent")
-workflow.add_conditional_edges("agent", should_continue, ["tools", END])
+workflow.add_conditional_edges("agent", should_continue, ["tools", "compact"])
 workflow.add_edge("tools", "agent")
+workflow.add_edge("compact", END)
 
-app = workflow.compile(checkpointer=MemorySaver())
+memory = BoundedMemorySaver()
+app = workflow.compile(checkpointer=memory)
+
+async def init_memory():
+    """Switches to the on-disk checkpointer when one is configured"""
+    global memory, app
+    saver = await open_checkpointer()
+    if saver is not None:
+        memory = saver
+        app = workflow.compile(checkpointer=memory)
+
+async def close_memory():
+    if hasattr(memory, "conn"):
+        await memory.conn.close()
+
+def memory_stats() -> dict:
+    return {"memory": memory.stats(), "prompt": prompt_stats.stats(), "tools": tool_pool.stats()}
 
 # --- 3. Entry Point ---
 
-async def get_bot_response(user_query: str, db, user_id: int) -> str:
-    system_message = SystemMessage(content="""
-    You are a AI stock platform assistant. 
-    1. For current price, use 'get_stock_price'. 
-    2. For 'why','will stock price increase or decrease','growth' use 'get_market_news'. 
-    3. Always give a final answer after tool use.
-    """)
+class GenerationLimiter:
+    """Active generations per user. All of a user's chats share one thread, so the default is 1."""
+
+    def __init__(self, per_user: int = CHAT_MAX_ACTIVE_PER_USER):
+        self.per_user = per_user
+        self.active: Dict[int, int] = {}
 
+    def try_acquire(self, user_id: int) -> bool:
+        if self.active.get(user_id, 0) >= self.per_user:
+            return False
+        self.active[user_id] = self.active.get(user_id, 0) + 1
+        return True
+
+    def release(self, user_id: int):
+        remaining = self.active.get(user_id, 0) - 1
+        if remaining > 0:
+            self.active[user_id] = remaining
+        else:
+            self.active.pop(user_id, None)
+
+generations = GenerationLimiter()
+
+async def stream_bot_response(user_query: str, db, user_id: int) -> AsyncIterator[dict]:
+    """
+    Runs the agent and yields events as they happen:
+    token (model output), tool_start / tool_end, then done with the full answer, or error.
+    Closing the iterator cancels the graph along with any async tool still running.
+    """
     config = {
         "configurable": {
             "thread_id": str(user_id),
@@ -144,20 +214,36 @@ async def get_bot_response(user_query: str, db, user_id: int) -> str:
         "recursion_limit": 10
     }
 
-    input_messages = [system_message, HumanMessage(content=user_query)]
+    input_messages = [HumanMessage(content=user_query)]
     final_response = ""
     
     try:
-        async for event in app.astream_events({"messages": input_messages}, config=config, version="v1"):
+        async for event in app.astream_events({"messages": input_messages}, config=config, version="v2"):
             if event["event"] == "on_chat_model_stream":
                 content = event["data"]["chunk"].content
-                if content: final_response += content
+                if content:
+                    final_response += content
+                    yield {"type": "token", "content": content}
+            elif event["event"] == "on_tool_start":
+                yield {"type": "tool_start", "tool": event["name"]}
+            elif event["event"] == "on_tool_end":
+                yield {"type": "tool_end", "tool": event["name"]}
 
         if not final_response:
-            snapshot = app.get_state(config)
+            snapshot = await app.aget_state(config)
             final_response = snapshot.values['messages'][-1].content
             
     except Exception as e:
-        return f"Error: {str(e)}"
+        yield {"type": "error", "detail": str(e)}
+        return
+
+    yield {"type": "done", "response": final_response}
 
+async def get_bot_response(user_query: str, db, user_id: int) -> str:
+    final_response = ""
+    async for event in stream_bot_response(user_query, db, user_id):
+        if event["type"] == "error":
+            return f"Error: {event['detail']}"
+        if event["type"] == "done":
+            final_response = event["response"]
     return final_response
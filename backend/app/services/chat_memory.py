@@ -0,0 +1,233 @@
+import importlib.util
+import time
+from collections import OrderedDict
+from typing import Dict, List
+from langchain_core.messages import HumanMessage, RemoveMessage, ToolMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from app.core.config import (
+    CHAT_HISTORY_TURNS, CHAT_TOOL_PAYLOAD_CHARS, CHAT_MAX_THREADS, CHAT_THREAD_TTL, CHAT_MEMORY_DB
+)
+
+# The on-disk backend needs the optional 'langgraph-checkpoint-sqlite' package
+SQLITE_AVAILABLE = importlib.util.find_spec("langgraph.checkpoint.sqlite") is not None
+
+# ------------------ MESSAGE WINDOW ------------------
+def compact_messages(messages: list, turns: int = CHAT_HISTORY_TURNS, payload_chars: int = CHAT_TOOL_PAYLOAD_CHARS) -> list:
+    """
+    State updates (for add_messages) that keep a thread to its last `turns` questions,
+    cut at HumanMessage boundaries so no tool result loses its tool call, and shorten
+    tool output the model has already answered from to `payload_chars`.
+    """
+    updates = []
+    human = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+    cut = human[-turns] if len(human) > turns else 0
+    updates.extend(RemoveMessage(id=message.id) for message in messages[:cut])
+
+    for message in messages[cut:]:
+        if isinstance(message, ToolMessage) and isinstance(message.content, str) and len(message.content) > payload_chars:
+            updates.append(message.model_copy(update={"content": message.content[:payload_chars] + " ...[trimmed]"}))
+    return updates
+
+# ------------------ THREAD EVICTION ------------------
+class ThreadTracker:
+    """LRU order of threads plus last use; says which threads to drop when over size or idle"""
+
+    def __init__(self, max_threads: int = CHAT_MAX_THREADS, ttl: float = CHAT_THREAD_TTL):
+        self.max_threads = max_threads
+        self.ttl = ttl
+        self.last_used: OrderedDict = OrderedDict()
+        self.evictions = 0
+
+    def touch(self, thread_id: str) -> List[str]:
+        now = time.monotonic()
+        self.last_used[thread_id] = now
+        self.last_used.move_to_end(thread_id)
+
+        expired = []
+        for candidate, used in self.last_used.items():
+            if len(self.last_used) - len(expired) > self.max_threads or now - used > self.ttl:
+                expired.append(candidate)
+            else:
+                break
+        for candidate in expired:
+            del self.last_used[candidate]
+        self.evictions += len(expired)
+        return expired
+
+    def forget(self, thread_id: str):
+        self.last_used.pop(thread_id, None)
+
+# ------------------ IN-MEMORY BACKEND ------------------
+class BoundedMemorySaver(InMemorySaver):
+    """
+    InMemorySaver that keeps only the latest checkpoint of each thread (the stock saver
+    keeps every step of every conversation forever) and evicts threads by LRU / idle TTL.
+    Blob and write keys are indexed per thread so pruning never scans other threads.
+    """
+
+    def __init__(self, tracker: ThreadTracker | None = None):
+        super().__init__()
+        self.tracker = tracker or ThreadTracker()
+        self.blob_keys: Dict[str, set] = {}
+        self.write_keys: Dict[str, set] = {}
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        result = super().put(config, checkpoint, metadata, new_versions)
+
+        keys = self.blob_keys.setdefault(thread_id, set())
+        keys.update((thread_id, checkpoint_ns, k, v) for k, v in new_versions.items())
+        self._prune(thread_id, checkpoint_ns, checkpoint)
+
+        for expired in self.tracker.touch(thread_id):
+            if expired != thread_id:
+                self.delete_thread(expired)
+        return result
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        super().put_writes(config, writes, task_id, task_path)
+        thread_id = config["configurable"]["thread_id"]
+        self.write_keys.setdefault(thread_id, set()).add(
+            (thread_id, config["configurable"].get("checkpoint_ns", ""), config["configurable"]["checkpoint_id"])
+        )
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, latest):
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [c for c in checkpoints if c != latest["id"]]:
+            del checkpoints[checkpoint_id]
+            key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(key, None)
+            self.write_keys.get(thread_id, set()).discard(key)
+
+        # Channels untouched by the last step still point at older blob versions
+        referenced = {(thread_id, checkpoint_ns, k, v) for k, v in latest["channel_versions"].items()}
+        keys = self.blob_keys[thread_id]
+        for key in [k for k in keys if k[1] == checkpoint_ns and k not in referenced]:
+            self.blobs.pop(key, None)
+            keys.discard(key)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.storage.pop(thread_id, None)
+        for key in self.write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+        for key in self.blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        self.tracker.forget(thread_id)
+
+    def thread_bytes(self, thread_id: str) -> int:
+        size = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                size += len(checkpoint[1]) + len(metadata[1])
+        for key in self.blob_keys.get(thread_id, ()):
+            if key in self.blobs:
+                size += len(self.blobs[key][1])
+        for key in self.write_keys.get(thread_id, ()):
+            for _, _, value, _ in self.writes.get(key, {}).values():
+                size += len(value[1])
+        return size
+
+    def stats(self) -> dict:
+        sizes = [self.thread_bytes(thread_id) for thread_id in list(self.storage)]
+        return {
+            "backend": "memory",
+            "threads": len(sizes),
+            "bytes": sum(sizes),
+            "bytes_per_thread_avg": int(sum(sizes) / len(sizes)) if sizes else 0,
+            "bytes_per_thread_max": max(sizes, default=0),
+            "evictions": self.tracker.evictions,
+        }
+
+# ------------------ SQLITE BACKEND ------------------
+if SQLITE_AVAILABLE:
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class BoundedSqliteSaver(AsyncSqliteSaver):
+        """
+        On-disk checkpoints, so conversations survive restarts without living in RAM.
+        Same policy as BoundedMemorySaver: older checkpoints of a thread are deleted on
+        each write and idle threads are dropped. Threads already on disk at startup get
+        a fresh idle clock.
+        """
+
+        def __init__(self, conn, tracker: ThreadTracker | None = None):
+            super().__init__(conn)
+            self.tracker = tracker or ThreadTracker()
+
+        async def setup(self):
+            first = not self.is_setup
+            await super().setup()
+            if first:
+                async with self.conn.execute("SELECT DISTINCT thread_id FROM checkpoints") as cursor:
+                    for (thread_id,) in await cursor.fetchall():
+                        self.tracker.touch(thread_id)
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            result = await super().aput(config, checkpoint, metadata, new_versions)
+            thread_id = str(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            async with self.lock:
+                for table in ("checkpoints", "writes"):
+                    await self.conn.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                        (thread_id, checkpoint_ns, checkpoint["id"])
+                    )
+                await self.conn.commit()
+            for expired in self.tracker.touch(thread_id):
+                if expired != thread_id:
+                    await self.adelete_thread(expired)
+            return result
+
+        async def adelete_thread(self, thread_id: str) -> None:
+            await super().adelete_thread(thread_id)
+            self.tracker.forget(thread_id)
+
+        def stats(self) -> dict:
+            return {
+                "backend": "sqlite",
+                "path": CHAT_MEMORY_DB,
+                "threads": len(self.tracker.last_used),
+                "evictions": self.tracker.evictions,
+            }
+
+async def open_checkpointer():
+    """SQLite saver when CHAT_MEMORY_DB is set and the package is installed, else None"""
+    if not CHAT_MEMORY_DB:
+        return None
+    if not SQLITE_AVAILABLE:
+        print("CHAT_MEMORY_DB is set but langgraph-checkpoint-sqlite is not installed; chat memory stays in RAM")
+        return None
+    import aiosqlite
+    saver = BoundedSqliteSaver(await aiosqlite.connect(CHAT_MEMORY_DB))
+    await saver.setup()
+    return saver
+
+# ------------------ PROMPT SIZE ------------------
+class PromptStats:
+    """Prompt size sent to the model per agent step, from the provider's token usage"""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_tokens = 0
+        self.max_tokens = 0
+        self.last_tokens = 0
+        self.last_messages = 0
+
+    def record(self, messages: int, input_tokens: int):
+        self.calls += 1
+        self.total_tokens += input_tokens
+        self.max_tokens = max(self.max_tokens, input_tokens)
+        self.last_tokens = input_tokens
+        self.last_messages = messages
+
+    def stats(self) -> dict:
+        return {
+            "calls": self.calls,
+            "avg_input_tokens": int(self.total_tokens / self.calls) if self.calls else 0,
+            "max_input_tokens": self.max_tokens,
+            "last_input_tokens": self.last_tokens,
+            "last_messages": self.last_messages,
+        }
+
+prompt_stats = PromptStats()
@@ -0,0 +1,360 @@
+import asyncio
+import time
+import orjson
+from collections import deque
+from fastapi import WebSocket
+from typing import Dict, Any, Set
+from .wire_format import WireFormat, JSON_FORMAT
+
+# Every Nth market frame is a full snapshot so clients recover from missed deltas
+KEYFRAME_INTERVAL = 30
+# Market frames a client may have queued before its backlog is conflated to one snapshot
+OUTBOUND_QUEUE_SIZE = 8
+# A client whose oldest undelivered frame is older than this is disconnected
+MAX_LAG_SECONDS = 10.0
+# Longest an evicted client's closing handshake may take; it runs in the background
+CLOSE_TIMEOUT = 2.0
+# Topic that receives every stock (the dashboard); new connections start on it
+ALL_TOPIC = "all"
+
+def encode_frame(frame: dict) -> str:
+    """JSON text for control and private messages; market frames go through WireFormat"""
+    return orjson.dumps(frame, option=orjson.OPT_NON_STR_KEYS).decode()
+
+# ------------------ PER-CLIENT WRITER ------------------
+class ClientConnection:
+    """
+    One socket with its own bounded outbound queue and writer task, so a slow client
+    only delays itself. Market frames are conflated when the queue is full; personal
+    messages are never dropped.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: int = None, wire: WireFormat = JSON_FORMAT):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.wire = wire
+        # Subscribed stock_ids and/or ALL_TOPIC, frozen so it can key a subscription group
+        self.topics: frozenset = frozenset([ALL_TOPIC])
+        # Items: (is_market, payload, enqueued_at), oldest first
+        self.pending: deque = deque()
+        self.market_pending = 0
+        self.conflated = 0
+        # enqueued_at of the frame the writer is sending, None while it is idle
+        self.sending_since: float | None = None
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._writer: asyncio.Task | None = None
+
+    def start(self, on_close):
+        self._writer = asyncio.create_task(self._write_loop(on_close))
+
+    def lag(self) -> float:
+        """Age of the oldest frame not yet delivered, in flight or queued"""
+        if self.sending_since is not None:
+            return time.monotonic() - self.sending_since
+        if self.pending:
+            return time.monotonic() - self.pending[0][2]
+        return 0.0
+
+    def send(self, payload: str):
+        """Queues a message that must be delivered (private channel, acks)"""
+        self._enqueue(False, payload)
+
+    def send_market(self, payload: str, snapshot):
+        """
+        Queues a market frame. When the queue is full the backlog of market frames is
+        replaced by one full snapshot (conflate-to-latest); snapshot(topics, wire) builds it lazily.
+        The snapshot takes the place and enqueue time of the oldest frame it replaces, so
+        conflating never makes a stalled client look caught up.
+        """
+        if self.market_pending < OUTBOUND_QUEUE_SIZE:
+            self._enqueue(True, payload)
+            self.market_pending += 1
+            return
+        conflated = deque()
+        for item in self.pending:
+            if not item[0]:
+                conflated.append(item)
+            elif self.market_pending:
+                conflated.append((True, snapshot(self.topics, self.wire), item[2]))
+                self.market_pending = 0
+        self.pending = conflated
+        self.market_pending = 1
+        self.conflated += 1
+        self._wakeup.set()
+
+    def _enqueue(self, is_market: bool, payload):
+        self.pending.append((is_market, payload, time.monotonic()))
+        self._wakeup.set()
+
+    async def _write_loop(self, on_close):
+        try:
+            while not self.closed:
+                await self._wakeup.wait()
+                self._wakeup.clear()
+                while self.pending and not self.closed:
+                    is_market, payload, self.sending_since = self.pending.popleft()
+                    if is_market:
+                        self.market_pending -= 1
+                    if isinstance(payload, bytes):
+                        await self.websocket.send_bytes(payload)
+                    else:
+                        await self.websocket.send_text(payload)
+                    self.sending_since = None
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass # Socket is gone, fall through to cleanup
+        on_close(self)
+
+    async def close(self):
+        """Closing handshake for an evicted client, bounded by CLOSE_TIMEOUT"""
+        try:
+            await asyncio.wait_for(self.websocket.close(code=1013), CLOSE_TIMEOUT)
+        except Exception:
+            pass
+
+    def stop(self):
+        self.closed = True
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+
+# ------------------ WEBSOCKET MANAGER ------------------
+class ConnectionManager:
+    def __init__(self):
+        self.active_connections: Dict[WebSocket, ClientConnection] = {}
+        self.user_connections: Dict[int, ClientConnection] = {}
+        self.evicted = 0
+        # Closing handshakes of evicted clients still in progress
+        self._closing: Set[asyncio.Task] = set()
+
+        # Topic index: stock_id (or ALL_TOPIC) -> subscribed connections
+        self.topics: Dict[Any, Set[ClientConnection]] = {}
+        # Connections grouped by identical subscription sets; one frame is encoded per group
+        self.groups: Dict[frozenset, Set[ClientConnection]] = {}
+
+        # Market feed state: last published value of every stock and the frame sequence
+        self.published: Dict[int, Dict[str, Any]] = {}
+        self.seq = 0
+        self.last_keyframe_seq = 0
+        self._snapshot_cache: Dict[tuple, str | bytes] = {}
+        self._snapshot_seq = 0
+
+        # Static per-stock fields for columnar clients, sent once and again when they change
+        self.dictionary: Dict[int, Dict[str, Any]] = {}
+        self.dictionary_version = 0
+
+    # FIX 1: Add user_id parameter here
+    async def connect(self, websocket: WebSocket, user_id: int = None, wire: WireFormat = JSON_FORMAT):
+        """user_id must come from a verified token; it owns the private channel"""
+        await websocket.accept()
+        connection = ClientConnection(websocket, user_id, wire)
+        self.active_connections[websocket] = connection
+        self._index(connection)
+        if wire.encoding == "columnar" and self.dictionary:
+            connection.send(self.dictionary_frame(wire))
+
+        # FIX 2: Store the user connection if user_id is provided
+        if user_id is not None:
+            self.user_connections[user_id] = connection
+            print(f"User {user_id} connected to private channel")
+
+        connection.start(self._remove)
+        # Send the latest full snapshot if available
+        self.send_snapshot(websocket)
+
+    # FIX 3: Add user_id to disconnect logic
+    def disconnect(self, websocket: WebSocket, user_id: int = None):
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            self._remove(connection)
+            connection.stop()
+
+    def _remove(self, connection: ClientConnection):
+        if self.active_connections.pop(connection.websocket, None) is not None:
+            self._unindex(connection)
+        if connection.user_id is not None and self.user_connections.get(connection.user_id) is connection:
+            del self.user_connections[connection.user_id]
+
+    async def broadcast(self, message: str):
+        for connection in list(self.active_connections.values()):
+            connection.send(message)
+
+    def _evict_slow_consumers(self):
+        """Drops clients that fell too far behind; their close never holds up the tick"""
+        slow = [c for c in self.active_connections.values() if c.lag() > MAX_LAG_SECONDS]
+        for connection in slow:
+            self._remove(connection)
+            connection.stop()
+            self.evicted += 1
+            task = asyncio.create_task(connection.close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    def stats(self) -> dict:
+        connections = list(self.active_connections.values())
+        return {
+            "connections": len(connections),
+            "subscription_groups": len(self.groups),
+            "evicted": self.evicted,
+            "closing": len(self._closing),
+            "conflated": sum(c.conflated for c in connections),
+            "max_lag": round(max((c.lag() for c in connections), default=0.0), 3),
+        }
+
+    # ------------------ SUBSCRIPTIONS ------------------
+    def _index(self, connection: ClientConnection):
+        for topic in connection.topics:
+            self.topics.setdefault(topic, set()).add(connection)
+        self.groups.setdefault(connection.topics, set()).add(connection)
+
+    def _unindex(self, connection: ClientConnection):
+        for topic in connection.topics:
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(connection)
+                if not subscribers:
+                    del self.topics[topic]
+        group = self.groups.get(connection.topics)
+        if group is not None:
+            group.discard(connection)
+            if not group:
+                del self.groups[connection.topics]
+
+    def subscribers(self, stock_id: int) -> int:
+        """Number of sockets that receive this stock"""
+        return len(self.topics.get(stock_id, ())) + len(self.topics.get(ALL_TOPIC, ()))
+
+    def _set_topics(self, connection: ClientConnection, topics: frozenset):
+        self._unindex(connection)
+        connection.topics = topics
+        self._index(connection)
+        connection.send(encode_frame({"type": "subscribed", "topics": sorted(topics, key=str)}))
+        self.send_snapshot(connection.websocket)
+
+    def handle_message(self, websocket: WebSocket, message: dict):
+        """
+        Client protocol on /ws/market:
+          {"type": "subscribe", "stock_ids": [1, 2]}    add tickers (the first one replaces the default "all")
+          {"type": "subscribe", "stock_ids": ["all"]}   every ticker, as the dashboard does
+          {"type": "unsubscribe", "stock_ids": [2]}
+          {"type": "resync"}                            fresh full snapshot after a seq gap
+        """
+        connection = self.active_connections.get(websocket)
+        if connection is None or not isinstance(message, dict):
+            return
+
+        action = message.get("type")
+        if action == "resync":
+            self.send_snapshot(websocket)
+            return
+        if action not in ("subscribe", "unsubscribe"):
+            return
+
+        requested = set()
+        for topic in message.get("stock_ids") or []:
+            if topic == ALL_TOPIC:
+                requested.add(ALL_TOPIC)
+            elif isinstance(topic, int) or (isinstance(topic, str) and topic.isdigit()):
+                requested.add(int(topic))
+
+        if action == "subscribe":
+            current = connection.topics
+            # The implicit "all" a client starts on gives way to its first explicit ticker list
+            if current == {ALL_TOPIC} and ALL_TOPIC not in requested:
+                current = frozenset()
+            self._set_topics(connection, current | requested)
+        else:
+            self._set_topics(connection, frozenset(connection.topics - requested))
+
+    # ------------------ MARKET FEED ------------------
+    def dictionary_frame(self, wire: WireFormat) -> str | bytes:
+        return wire.encode({
+            "type": "dictionary",
+            "version": self.dictionary_version,
+            "stocks": self.dictionary
+        })
+
+    def _update_dictionary(self, changed: Dict[int, Dict[str, Any]]) -> bool:
+        updated = False
+        for sid, stock in changed.items():
+            static = {"name": stock.get("name"), "prev_close": stock.get("prev_close")}
+            if self.dictionary.get(sid) != static:
+                self.dictionary[sid] = static
+                updated = True
+        if updated:
+            self.dictionary_version += 1
+        return updated
+
+    def _select(self, data: Dict[int, Dict[str, Any]], topics: frozenset) -> Dict[int, Dict[str, Any]]:
+        if ALL_TOPIC in topics:
+            return data
+        return {sid: data[sid] for sid in topics if sid in data}
+
+    def _frame(self, data: Dict[int, Dict[str, Any]], full: bool) -> dict:
+        return {"type": "update", "seq": self.seq, "full": full, "dict": self.dictionary_version, "data": data}
+
+    def snapshot_frame(self, topics: frozenset = frozenset([ALL_TOPIC]), wire: WireFormat = JSON_FORMAT) -> str | bytes | None:
+        """Full frame of a subscription set, encoded at most once per seq and wire format"""
+        if not self.published:
+            return None
+        if self._snapshot_seq != self.seq:
+            self._snapshot_cache = {}
+            self._snapshot_seq = self.seq
+        key = (topics, wire.key)
+        if key not in self._snapshot_cache:
+            self._snapshot_cache[key] = wire.encode(self._frame(self._select(self.published, topics), full=True))
+        return self._snapshot_cache[key]
+
+    def send_snapshot(self, websocket: WebSocket):
+        """Keyframe for a new client, or for one that detected a seq gap and asked to resync"""
+        connection = self.active_connections.get(websocket)
+        if connection is None:
+            return
+        frame = self.snapshot_frame(connection.topics, connection.wire)
+        if frame is not None:
+            connection.send_market(frame, self.snapshot_frame)
+
+    async def publish_market(self, data: Dict[int, Dict[str, Any]]):
+        """
+        Publishes a tick. Only stocks that changed since the last frame are sent, with a
+        full keyframe every KEYFRAME_INTERVAL frames. Clients merge frames by stock_id and
+        use 'seq' to detect gaps. Each distinct subscription set gets its subset encoded
+        once, and frames are only queued here; each client's writer task delivers them,
+        so this returns in time independent of slow sockets.
+        """
+        changed = {
+            sid: stock for sid, stock in data.items()
+            if self.published.get(sid) != stock
+        }
+        for sid, stock in changed.items():
+            self.published[sid] = dict(stock)
+
+        if self._update_dictionary(changed):
+            for connection in list(self.active_connections.values()):
+                if connection.wire.encoding == "columnar":
+                    connection.send(self.dictionary_frame(connection.wire))
+
+        self.seq += 1
+        keyframe = self.seq - self.last_keyframe_seq >= KEYFRAME_INTERVAL or self.last_keyframe_seq == 0
+        if keyframe:
+            self.last_keyframe_seq = self.seq
+
+        for topics, group in list(self.groups.items()):
+            delta = None if keyframe else self._frame(self._select(changed, topics), full=False)
+            # Encoded once per wire format present in the group
+            encoded = {}
+            for connection in list(group):
+                wire = connection.wire
+                if wire.key not in encoded:
+                    encoded[wire.key] = self.snapshot_frame(topics, wire) if keyframe else wire.encode(delta)
+                if encoded[wire.key] is not None:
+                    connection.send_market(encoded[wire.key], self.snapshot_frame)
+
+        self._evict_slow_consumers()
+
+    # FIX 4: Renamed to match trigger.py calls
+    async def send_personal_message(self, message: dict, user_id: int):
+        connection = self.user_connections.get(user_id)
+        if connection is not None:
+            connection.send(encode_frame(message))
@@ -1,66 +1,86 @@
 import datetime
+import json
+import os
 import yfinance as yf
-from zoneinfo import ZoneInfo
-
-
-def get_prev_close(TICKERS, ID_MAP):
-    ist = ZoneInfo("Asia/Kolkata")
-    today = datetime.datetime.now(ist).date()
-    weekday = today.weekday()  
-
-    symbols = [f"{name}.NS" for name in TICKERS]
-    prev_close_row = None
-
+from app.core.config import PREV_CLOSE_STORE
+from app.services.market_calendar import today_ist, latest_session, previous_trading_day
+
+# Closes kept on disk, newest first; older dates are pruned on save
+STORE_RETENTION_DAYS = 30
+# How far back a download reaches for an empty or long-stale store
+INITIAL_LOOKBACK_DAYS = 10
+
+# ------------------ LOCAL STORE ------------------
+# Format: { "2026-10-16": { "RELIANCE": 1402.3, "TCS": 3050.1, ... }, ... }
+def load_store(path: str = PREV_CLOSE_STORE) -> dict:
+    if not os.path.exists(path):
+        return {}
     try:
-
-        if weekday in [5, 6]:  
-            data_frame = yf.download(symbols, period='5d', progress=False, auto_adjust=False)['Close']
-            data_dates = [d.date() for d in data_frame.index]
-
-            if weekday == 5:      
-                target_date = today - datetime.timedelta(days = 2)
-            else:                
-                target_date = today - datetime.timedelta(days = 3)
-
-            while target_date not in data_dates:
-                target_date -= datetime.timedelta(days=1)
-
-            prev_close_row = data_frame.loc[data_frame.index.date == target_date].iloc[0]
-
-        else:
-
-            try:
-                data_frame = yf.download(symbols, period='2d', progress=False, auto_adjust=False)['Close']
-                prev_close_row = data_frame.iloc[-2] 
-                
-            except IndexError:
-                data_frame = yf.download(symbols, period='5d', progress=False, auto_adjust=False)['Close']
-
-                data_dates = [d.date() for d in data_frame.index]
-                target_date = today - datetime.timedelta(days=1)
-                while target_date not in data_dates:
-                    target_date -= datetime.timedelta(days=1)
-                prev_close_row = data_frame.loc[data_frame.index.date == target_date].iloc[0]
-
-        mapped_prev_close = {}
-        for name in TICKERS:
-            stock_id = ID_MAP[name]
-            try:
-                price = prev_close_row[f"{name}.NS"]
-
-                if str(price) != 'nan':
-                    mapped_prev_close[stock_id] = round(float(price), 2)  
-                else: 
-                    mapped_prev_close[stock_id] = 0
-                
-            except:
-                mapped_prev_close[stock_id] = 0
-        
-        return mapped_prev_close
-            
-
-    except Exception:
-        return {ID_MAP[name]: 0 for name in TICKERS}
-    
-
-
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_store(store: dict, path: str = PREV_CLOSE_STORE):
+    keep = sorted(store, reverse=True)[:STORE_RETENTION_DAYS]
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({day: store[day] for day in sorted(keep)}, f)
+    os.replace(tmp_path, path)
+
+def download_closes(names: list, start: datetime.date, end: datetime.date) -> dict:
+    """One batched yfinance download of daily closes for [start, end], in store format"""
+    symbols = [f"{name}.NS" for name in names]
+    data_frame = yf.download(
+        symbols, start=start.isoformat(), end=(end + datetime.timedelta(days=1)).isoformat(),
+        progress=False, auto_adjust=False
+    )['Close']
+
+    closes = {}
+    for timestamp, row in data_frame.iterrows():
+        day = timestamp.date().isoformat()
+        for name in names:
+            price = row.get(f"{name}.NS")
+            if price is not None and str(price) != 'nan':
+                closes.setdefault(day, {})[name] = round(float(price), 2)
+    return closes
+
+# ------------------ PREVIOUS CLOSE ------------------
+def get_prev_close(TICKERS, ID_MAP):
+    """
+    Previous session's close per stock_id, read from the local store. Only the symbols
+    missing for that date are downloaded, in one call, starting after the newest stored day.
+    """
+    target = previous_trading_day(latest_session(today_ist()))
+    target_key = target.isoformat()
+    store = load_store()
+
+    missing = [name for name in TICKERS if name not in store.get(target_key, {})]
+    if missing:
+        # Resume after the newest stored day; an empty store also pulls a few days back so an
+        # unlisted holiday on the target date still leaves an earlier close to fall back on
+        start = target - datetime.timedelta(days=INITIAL_LOOKBACK_DAYS)
+        stored_days = [day for day in store if day < target_key]
+        if stored_days:
+            start = max(start, datetime.date.fromisoformat(max(stored_days)) + datetime.timedelta(days=1))
+        try:
+            for day, closes in download_closes(missing, start, target).items():
+                store.setdefault(day, {}).update(closes)
+            save_store(store)
+        except Exception as e:
+            print(f"Previous close download failed: {e}")
+
+    mapped_prev_close = {}
+    days_newest_first = sorted((day for day in store if day <= target_key), reverse=True)
+    for name in TICKERS:
+        stock_id = ID_MAP[name]
+        # Fall back to the latest stored close rather than 0, which would zero day_change
+        price = next((store[day][name] for day in days_newest_first if name in store[day]), 0)
+        if price == 0:
+            print(f"No previous close for {name}")
+        mapped_prev_close[stock_id] = price
+
+    return mapped_prev_close
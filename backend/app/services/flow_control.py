@@ -0,0 +1,135 @@
+import asyncio
+import random
+import time
+from collections import deque
+from app.core.config import (
+    SCRAPER_MAX_CONCURRENCY, SCRAPER_MIN_CONCURRENCY, SCRAPER_INITIAL_CONCURRENCY,
+    BREAKER_FAILURES, BREAKER_RESET_SECONDS
+)
+
+# Outcomes recorded by the limiter
+SUCCESS = "success"
+OVERLOAD = "overload"   # 429, 5xx, timeout: upstream wants us to slow down
+ERROR = "error"         # anything else that failed; says nothing about load
+
+# Recent outcomes used for the error rates in stats()
+RATE_WINDOW = 200
+
+# ------------------ AIMD LIMITER ------------------
+class AdaptiveLimiter:
+    """
+    Concurrency limit that probes for the most in-flight requests the upstream tolerates.
+    Additive increase: +1 per `limit` successes (about one step per round of requests).
+    Multiplicative decrease: halve on overload, at most once per cooldown, so one burst
+    of failures from the same round does not collapse the limit to the floor.
+    """
+
+    def __init__(self, initial: int = SCRAPER_INITIAL_CONCURRENCY, min_limit: int = SCRAPER_MIN_CONCURRENCY,
+                 max_limit: int = SCRAPER_MAX_CONCURRENCY, backoff: float = 0.5, cooldown: float = 1.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(max(min_limit, min(initial, max_limit)))
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self.in_flight = 0
+        self.outcomes = deque(maxlen=RATE_WINDOW)
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, outcome: str):
+        async with self._condition:
+            self.in_flight -= 1
+            self.record(outcome)
+            self._condition.notify_all()
+
+    def record(self, outcome: str):
+        self.outcomes.append(outcome)
+        if outcome == SUCCESS:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        elif outcome == OVERLOAD:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.cooldown:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+                self.decreases += 1
+
+    def stats(self) -> dict:
+        total = len(self.outcomes)
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "min": self.min_limit,
+            "max": self.max_limit,
+            "decreases": self.decreases,
+            "overload_rate": round(self.outcomes.count(OVERLOAD) / total, 3) if total else 0.0,
+            "error_rate": round(self.outcomes.count(ERROR) / total, 3) if total else 0.0,
+        }
+
+# ------------------ CIRCUIT BREAKER ------------------
+class CircuitBreaker:
+    """
+    Per-host breaker. After `failures` overloads in a row the host is skipped for
+    `reset_seconds`; then one probe request is let through (half open) and its
+    result closes the breaker or re-opens it. Any answer that is not an overload counts
+    as a success; a probe that gets no answer at all must call release_probe().
+    """
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_seconds: float = BREAKER_RESET_SECONDS):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = self.CLOSED
+        self.consecutive = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.rejected = 0
+
+    def allow(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_seconds:
+            self.state = self.HALF_OPEN
+            return True
+        if self.state == self.CLOSED:
+            return True
+        # Open, or half open with the probe still in flight
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.consecutive = 0
+
+    def record_failure(self):
+        self.consecutive += 1
+        if self.state == self.HALF_OPEN or self.consecutive >= self.failures:
+            if self.state != self.OPEN:
+                self.trips += 1
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """The probe ended without a verdict (deadline, limiter wait, no response): open again"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive,
+            "trips": self.trips,
+            "rejected": self.rejected,
+        }
+
+# ------------------ RETRIES ------------------
+def backoff_delay(attempt: int, base: float, retry_after: float | None = None) -> float:
+    """Full jitter: uniform in [0, base * 2^attempt], but never before a Retry-After"""
+    delay = random.uniform(0, base * (2 ** attempt))
+    if retry_after is not None:
+        delay = max(delay, retry_after)
+    return delay
@@ -0,0 +1,95 @@
+from typing import Dict, Tuple
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.sql_models import Portfolio
+
+# ------------------ HOLDINGS INDEX ------------------
+class HoldingsIndex:
+    """
+    In-memory copy of every Portfolio row, indexed both ways:
+      by_stock: stock_id -> {user_id: (quantity, buy_price)}
+      by_user:  user_id -> {stock_id: (quantity, buy_price)}
+    plus each user's running totals. A tick only touches the users holding a stock whose
+    price moved, and their current value is adjusted by quantity * price delta.
+    """
+
+    def __init__(self):
+        self.by_stock: Dict[int, Dict[int, Tuple[int, float]]] = {}
+        self.by_user: Dict[int, Dict[int, Tuple[int, float]]] = {}
+        self.totals: Dict[int, Dict[str, float]] = {}
+        # Last price applied per stock; holdings are valued at buy_price until a tick arrives
+        self.prices: Dict[int, float] = {}
+
+    async def load(self, db: AsyncSession):
+        """Builds the index from the database at startup"""
+        result = await db.execute(select(Portfolio))
+        self.by_stock, self.by_user, self.totals = {}, {}, {}
+        for row in result.scalars().all():
+            self.by_stock.setdefault(row.stock_id, {})[row.user_id] = (row.quantity, float(row.buy_price))
+            self.by_user.setdefault(row.user_id, {})[row.stock_id] = (row.quantity, float(row.buy_price))
+        for user_id in self.by_user:
+            self._recompute(user_id)
+
+    def _price(self, stock_id: int, buy_price: float) -> float:
+        return self.prices.get(stock_id, buy_price)
+
+    def _recompute(self, user_id: int):
+        holdings = self.by_user.get(user_id)
+        if not holdings:
+            self.totals.pop(user_id, None)
+            return
+        invested = sum(qty * buy for qty, buy in holdings.values())
+        current = sum(qty * self._price(sid, buy) for sid, (qty, buy) in holdings.items())
+        self.totals[user_id] = {"invested": invested, "current_value": current}
+
+    def set_holding(self, user_id: int, stock_id: int, quantity: int, buy_price: float):
+        """Called by the buy/sell write paths after commit; quantity 0 removes the holding"""
+        if quantity > 0:
+            self.by_stock.setdefault(stock_id, {})[user_id] = (quantity, float(buy_price))
+            self.by_user.setdefault(user_id, {})[stock_id] = (quantity, float(buy_price))
+        else:
+            self.by_stock.get(stock_id, {}).pop(user_id, None)
+            self.by_user.get(user_id, {}).pop(stock_id, None)
+            if not self.by_user.get(user_id):
+                self.by_user.pop(user_id, None)
+        self._recompute(user_id)
+
+    def apply_prices(self, market_prices: dict) -> Dict[int, Dict[int, float]]:
+        """
+        Applies a tick. Returns {user_id: {stock_id: new_price}} for every user whose
+        value changed, so callers can push just those users.
+        """
+        touched: Dict[int, Dict[int, float]] = {}
+        for sid, stock in market_prices.items():
+            price = stock["price"]
+            holders = self.by_stock.get(sid)
+            old = self.prices.get(sid)
+            self.prices[sid] = price
+            if not holders or old == price:
+                continue
+            for user_id, (qty, buy) in holders.items():
+                previous = buy if old is None else old
+                self.totals[user_id]["current_value"] += qty * (price - previous)
+                touched.setdefault(user_id, {})[sid] = price
+        return touched
+
+    def summary(self, user_id: int, changed: Dict[int, float]) -> dict:
+        """Push payload for the private channel"""
+        totals = self.totals[user_id]
+        holdings = self.by_user[user_id]
+        return {
+            "type": "PORTFOLIO_UPDATE",
+            "invested": round(totals["invested"], 2),
+            "current_value": round(totals["current_value"], 2),
+            "pnl": round(totals["current_value"] - totals["invested"], 2),
+            "holdings": {
+                sid: {
+                    "price": price,
+                    "current_value": round(holdings[sid][0] * price, 2),
+                    "pnl": round((price - holdings[sid][1]) * holdings[sid][0], 2),
+                }
+                for sid, price in changed.items()
+            },
+        }
+
+holdings_index = HoldingsIndex()
@@ -0,0 +1,57 @@
+import datetime
+import json
+import os
+from zoneinfo import ZoneInfo
+from app.core.config import NSE_HOLIDAYS_FILE
+
+IST = ZoneInfo("Asia/Kolkata")
+
+# NSE equity segment trading holidays (weekday closures only), from the exchange circulars.
+# Extend or correct without a deploy through NSE_HOLIDAYS_FILE (JSON list of "YYYY-MM-DD").
+NSE_HOLIDAYS = {
+    # 2025
+    "2025-02-26", "2025-03-14", "2025-03-31", "2025-04-10", "2025-04-14",
+    "2025-04-18", "2025-05-01", "2025-08-15", "2025-08-27", "2025-10-02",
+    "2025-10-21", "2025-10-22", "2025-11-05", "2025-12-25",
+    # 2026
+    "2026-01-15", "2026-01-26", "2026-03-03", "2026-03-26", "2026-03-31",
+    "2026-04-03", "2026-04-14", "2026-05-01", "2026-05-28", "2026-06-26",
+    "2026-09-14", "2026-10-02", "2026-10-20", "2026-11-10", "2026-11-24",
+    "2026-12-25",
+}
+
+def _load_holidays() -> set:
+    holidays = {datetime.date.fromisoformat(d) for d in NSE_HOLIDAYS}
+    if NSE_HOLIDAYS_FILE and os.path.exists(NSE_HOLIDAYS_FILE):
+        with open(NSE_HOLIDAYS_FILE) as f:
+            holidays |= {datetime.date.fromisoformat(d) for d in json.load(f)}
+    return holidays
+
+HOLIDAYS = _load_holidays()
+
+def today_ist() -> datetime.date:
+    return datetime.datetime.now(IST).date()
+
+def is_trading_day(day: datetime.date) -> bool:
+    return day.weekday() < 5 and day not in HOLIDAYS
+
+def previous_trading_day(day: datetime.date) -> datetime.date:
+    """Last trading day strictly before `day`"""
+    day -= datetime.timedelta(days=1)
+    while not is_trading_day(day):
+        day -= datetime.timedelta(days=1)
+    return day
+
+def latest_session(day: datetime.date) -> datetime.date:
+    """The session whose prices are on screen on `day`: today if it trades, else the last one"""
+    return day if is_trading_day(day) else previous_trading_day(day)
+
+def trading_days(start: datetime.date, end: datetime.date) -> list:
+    """Trading days in [start, end]"""
+    days = []
+    day = start
+    while day <= end:
+        if is_trading_day(day):
+            days.append(day)
+        day += datetime.timedelta(days=1)
+    return days
@@ -0,0 +1,115 @@
+import asyncio
+import yfinance as yf
+from typing import Dict, List, Tuple
+from app.core.cache import TTLCache
+from app.core.config import MARKET_HISTORY_TTL, MARKET_HISTORY_CACHE_SIZE
+from app.services import scraper_engine
+from app.services.tool_pool import tool_pool
+
+# Hourly closes served to the chat tools: ((label, close), ...) oldest first
+History = Tuple[Tuple[str, float], ...]
+
+HISTORY_PERIOD = "5d"
+HISTORY_INTERVAL = "60m"
+# Unknown or delisted symbols are remembered briefly so they are not re-downloaded per question
+EMPTY_HISTORY_TTL = 60.0
+# Misses arriving within this window (e.g. parallel tool calls of one answer) share one download
+BATCH_WINDOW = 0.02
+
+def normalize_ticker(ticker: str) -> str:
+    return ticker.strip().upper().replace(".NS", "")
+
+def download_history(tickers: List[str]) -> Dict[str, History]:
+    """One batched yfinance download of 5 days of hourly closes"""
+    symbols = [f"{ticker}.NS" for ticker in tickers]
+    data_frame = yf.download(
+        symbols, period=HISTORY_PERIOD, interval=HISTORY_INTERVAL,
+        progress=False, auto_adjust=False
+    )['Close']
+
+    histories = {}
+    for ticker, symbol in zip(tickers, symbols):
+        if symbol not in data_frame:
+            continue
+        closes = data_frame[symbol].dropna()
+        histories[ticker] = tuple(
+            (idx.strftime('%m-%d %H:%M'), round(float(close), 2)) for idx, close in closes.items()
+        )
+    return histories
+
+# ------------------ HISTORY STORE ------------------
+class HistoryStore:
+    """
+    Read-through TTL cache in front of download_history with single-flight: a ticker
+    already being downloaded is awaited, not fetched again, and all misses queued within
+    BATCH_WINDOW go out as one batched download.
+    """
+
+    def __init__(self, maxsize: int = MARKET_HISTORY_CACHE_SIZE, ttl: float = MARKET_HISTORY_TTL):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.inflight: Dict[str, asyncio.Future] = {}
+        self.queued: List[str] = []
+        self.flush_task: asyncio.Task | None = None
+        self.downloads = 0
+        self.deduplicated = 0
+
+    async def get(self, tickers: List[str]) -> Dict[str, History]:
+        loop = asyncio.get_running_loop()
+        results: Dict[str, History] = {}
+        waiting: Dict[str, asyncio.Future] = {}
+        for ticker in dict.fromkeys(tickers):
+            history = self.cache.get(ticker)
+            if history is not None:
+                results[ticker] = history
+                continue
+            future = self.inflight.get(ticker)
+            if future is None:
+                future = self.inflight[ticker] = loop.create_future()
+                self.queued.append(ticker)
+            else:
+                self.deduplicated += 1
+            waiting[ticker] = future
+
+        if self.queued and self.flush_task is None:
+            self.flush_task = asyncio.create_task(self._flush())
+        for ticker, future in waiting.items():
+            # Shielded: one caller giving up must not cancel the result for the others
+            results[ticker] = await asyncio.shield(future)
+        return results
+
+    async def _flush(self):
+        await asyncio.sleep(BATCH_WINDOW)
+        batch, self.queued, self.flush_task = self.queued, [], None
+
+        loop = asyncio.get_running_loop()
+        self.downloads += 1
+        try:
+            # Blocking I/O on the chat tool pool, not the default executor
+            histories = await loop.run_in_executor(tool_pool.executor, download_history, batch)
+        except Exception as e:
+            print(f"History download failed: {e}")
+            histories = {}
+
+        for ticker in batch:
+            history = histories.get(ticker, ())
+            self.cache.set(ticker, history, ttl=None if history else EMPTY_HISTORY_TTL)
+            future = self.inflight.pop(ticker)
+            if not future.done():
+                future.set_result(history)
+
+    def stats(self) -> dict:
+        return {
+            **self.cache.stats(),
+            "downloads": self.downloads,
+            "deduplicated": self.deduplicated,
+            "inflight": len(self.inflight),
+        }
+
+history_store = HistoryStore()
+
+def live_price(ticker: str) -> float | None:
+    """Latest scraped price, if the ticker is in the tracked universe"""
+    sid = scraper_engine.ID_MAP.get(ticker)
+    if sid is None:
+        return None
+    return scraper_engine.CACHE.get(sid, {}).get("price")
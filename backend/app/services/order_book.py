@@ -0,0 +1,90 @@
+import heapq
+import itertools
+from typing import Dict, List, Tuple
+from app.models.sql_models import OrderTrigger
+
+# Compact a side once more than half of its heap entries are cancelled leftovers
+COMPACT_RATIO = 0.5
+
+
+class OrderBook:
+    """
+    Pending trigger orders for a single stock, split into two price-sorted sides.
+
+    BUY side is a max-heap on target_price (fires when price <= target), SELL side
+    is a min-heap on target_price (fires when price >= target). A tick only pops the
+    orders whose target was crossed, so matching cost depends on what fires, not on
+    how many orders are resting. Add and fire are O(log n); cancel is O(1) and the
+    dead heap entry is skipped lazily when it reaches the top.
+    """
+
+    def __init__(self):
+        # Heap entries: (sort_key, seq, trigger_id). seq keeps FIFO order on equal prices.
+        self._buys: List[Tuple[float, int, int]] = []
+        self._sells: List[Tuple[float, int, int]] = []
+        # trigger_id -> (seq, order). An entry is live only if its seq matches.
+        self._orders: Dict[int, Tuple[int, OrderTrigger]] = {}
+        self._seq = itertools.count()
+        self._dead = 0
+
+    def __len__(self):
+        return len(self._orders)
+
+    def __contains__(self, trigger_id: int):
+        return trigger_id in self._orders
+
+    def orders(self) -> List[OrderTrigger]:
+        return [order for _, order in self._orders.values()]
+
+    def add(self, order: OrderTrigger):
+        """Inserts a pending order into its side of the book."""
+        if order.trigger_id in self._orders:
+            self.cancel(order.trigger_id)
+
+        seq = next(self._seq)
+        target = float(order.target_price)
+        self._orders[order.trigger_id] = (seq, order)
+        if order.order_type == "B":
+            heapq.heappush(self._buys, (-target, seq, order.trigger_id))
+        else:
+            heapq.heappush(self._sells, (target, seq, order.trigger_id))
+
+    def cancel(self, trigger_id: int) -> OrderTrigger | None:
+        """Removes an order from the book. Returns the order, or None if it was not resting."""
+        entry = self._orders.pop(trigger_id, None)
+        if entry is None:
+            return None
+        self._dead += 1
+        if self._dead > COMPACT_RATIO * (len(self._buys) + len(self._sells)):
+            self._compact()
+        return entry[1]
+
+    def match(self, current_price: float) -> List[OrderTrigger]:
+        """Pops and returns every order whose target price is crossed by current_price."""
+        fired = []
+        # BUY fires while the highest target is at or above the market price
+        while self._buys and -self._buys[0][0] >= current_price:
+            self._pop_live(self._buys, fired)
+        # SELL fires while the lowest target is at or below the market price
+        while self._sells and self._sells[0][0] <= current_price:
+            self._pop_live(self._sells, fired)
+        return fired
+
+    def _pop_live(self, side: list, fired: list):
+        _, seq, trigger_id = heapq.heappop(side)
+        entry = self._orders.get(trigger_id)
+        if entry is None or entry[0] != seq:
+            # Leftover of a cancelled (or re-added) order
+            self._dead -= 1
+            return
+        del self._orders[trigger_id]
+        fired.append(entry[1])
+
+    def _compact(self):
+        """Drops cancelled entries from both heaps."""
+        live = lambda item: item[2] in self._orders and self._orders[item[2]][0] == item[1]
+        self._buys = [item for item in self._buys if live(item)]
+        self._sells = [item for item in self._sells if live(item)]
+        heapq.heapify(self._buys)
+        heapq.heapify(self._sells)
+        self._dead = 0
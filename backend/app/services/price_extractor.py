@@ -0,0 +1,119 @@
+import re
+from typing import Dict
+from bs4 import BeautifulSoup
+
+# Class of the element holding the live price on a Google Finance quote page
+PRICE_CLASS = "YMlKec fxKbKc"
+
+def _to_price(text: str) -> float | None:
+    try:
+        return float(text.strip().replace("₹", "").replace(",", ""))
+    except ValueError:
+        return None
+
+# ------------------ EXTRACTORS ------------------
+class PriceExtractor:
+    """Pulls the price out of a quote page. Returns None when the page does not match."""
+    name = "base"
+
+    def extract(self, html: str) -> float | None:
+        raise NotImplementedError
+
+class FindPriceExtractor(PriceExtractor):
+    """Locates the price node with plain substring search, no tree is built"""
+    name = "find"
+
+    def __init__(self, price_class: str = PRICE_CLASS):
+        self.marker = f'class="{price_class}"'
+
+    def extract(self, html: str) -> float | None:
+        start = html.find(self.marker)
+        if start == -1:
+            return None
+        start = html.find(">", start + len(self.marker))
+        if start == -1:
+            return None
+        end = html.find("<", start + 1)
+        if end == -1:
+            return None
+        return _to_price(html[start + 1:end])
+
+class RegexPriceExtractor(PriceExtractor):
+    """Same locator as a regex, tolerant to attribute order and quoting"""
+    name = "regex"
+
+    def __init__(self, price_class: str = PRICE_CLASS):
+        self.pattern = re.compile(
+            r"""<[a-zA-Z]+[^>]*\bclass=["']""" + re.escape(price_class) + r"""["'][^>]*>([^<]+)<"""
+        )
+
+    def extract(self, html: str) -> float | None:
+        match = self.pattern.search(html)
+        if not match:
+            return None
+        return _to_price(match.group(1))
+
+class SoupPriceExtractor(PriceExtractor):
+    """Full BeautifulSoup parse. Slow, but survives markup the fast paths do not expect"""
+    name = "soup"
+
+    def __init__(self, price_class: str = PRICE_CLASS):
+        self.price_class = price_class
+
+    def extract(self, html: str) -> float | None:
+        soup = BeautifulSoup(html, "html.parser")
+        tag = soup.find(class_=self.price_class)
+        if tag:
+            return _to_price(tag.text)
+        return None
+
+EXTRACTORS: Dict[str, type] = {
+    FindPriceExtractor.name: FindPriceExtractor,
+    RegexPriceExtractor.name: RegexPriceExtractor,
+    SoupPriceExtractor.name: SoupPriceExtractor,
+}
+
+# ------------------ FAST PATH + FALLBACK ------------------
+class TieredPriceExtractor:
+    """
+    Tries the fast extractor first and only falls back to the full parse when it misses.
+    Fallbacks are counted: a rising count means the quote page markup has changed.
+    """
+
+    def __init__(self, fast: PriceExtractor, fallback: PriceExtractor):
+        self.fast = fast
+        self.fallback = fallback
+        self.fast_hits = 0
+        self.fallbacks = 0
+        self.failures = 0
+
+    def extract_fast(self, html: str) -> float | None:
+        price = self.fast.extract(html)
+        if price is not None:
+            self.fast_hits += 1
+        return price
+
+    def extract_fallback(self, html: str) -> float | None:
+        self.fallbacks += 1
+        price = self.fallback.extract(html)
+        if price is None:
+            self.failures += 1
+        return price
+
+    def extract(self, html: str) -> float | None:
+        price = self.extract_fast(html)
+        if price is None:
+            price = self.extract_fallback(html)
+        return price
+
+    def stats(self) -> dict:
+        return {
+            "fast": self.fast.name,
+            "fallback": self.fallback.name,
+            "fast_hits": self.fast_hits,
+            "fallbacks": self.fallbacks,
+            "failures": self.failures,
+        }
+
+def build_extractor(fast: str = "find", fallback: str = "soup") -> TieredPriceExtractor:
+    return TieredPriceExtractor(EXTRACTORS[fast](), EXTRACTORS[fallback]())
@@ -0,0 +1,373 @@
+import asyncio
+import datetime
+import importlib.util
+import zlib
+import httpx
+import numpy as np
+import yfinance as yf
+from typing import Dict, List
+from app.services.price_extractor import build_extractor
+from app.services.tick_log import TickLogReader
+from app.services.flow_control import AdaptiveLimiter, CircuitBreaker, backoff_delay, SUCCESS, OVERLOAD, ERROR
+from app.core.config import (
+    SCRAPER_BASE_URL, SCRAPER_MAX_CONCURRENCY, SCRAPER_TIMEOUT, SCRAPER_EXTRACTOR,
+    SCRAPER_RETRIES, SCRAPER_RETRY_BACKOFF, SCRAPER_CYCLE_DEADLINE,
+    SIMULATED_SEED, SIMULATED_VOLATILITY, SIMULATED_REPLAY_DAY
+)
+
+def _retry_after(response: httpx.Response) -> float | None:
+    try:
+        return float(response.headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+# HTTP/2 needs the optional 'h2' package; fall back to HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# ------------------ INTERFACE ------------------
+class PriceSource:
+    """
+    Quotes for a batch of NSE tickers. fetch() returns {ticker: price} for the ones it
+    could price; missing tickers are simply left out so a failover can ask the next source.
+    """
+    name = "base"
+
+    def __init__(self):
+        self.requests = 0
+        self.prices = 0
+        self.errors = 0
+        self.last_error = None
+
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {
+            "source": self.name,
+            "requests": self.requests,
+            "prices": self.prices,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+# ------------------ GOOGLE FINANCE ------------------
+class GoogleFinanceSource(PriceSource):
+    """
+    One quote page per ticker over a shared keep-alive client. In-flight requests are
+    capped by an AIMD limiter, each host has a circuit breaker, and every fetch() must
+    finish within cycle_deadline, retries included.
+    """
+    name = "google"
+
+    def __init__(self, base_url: str = SCRAPER_BASE_URL, max_concurrency: int = SCRAPER_MAX_CONCURRENCY,
+                 timeout: float = SCRAPER_TIMEOUT, extractor: str = SCRAPER_EXTRACTOR,
+                 retries: int = SCRAPER_RETRIES, retry_backoff: float = SCRAPER_RETRY_BACKOFF,
+                 cycle_deadline: float = SCRAPER_CYCLE_DEADLINE):
+        super().__init__()
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.cycle_deadline = cycle_deadline
+        # In-flight requests float between SCRAPER_MIN_CONCURRENCY and max_concurrency
+        self.limiter = AdaptiveLimiter(max_limit=max_concurrency)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.retried = 0
+        self.deadline_misses = 0
+        self.extractor = build_extractor(fast=extractor, fallback="soup")
+        self.client: httpx.AsyncClient | None = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Shared keep-alive client, so every cycle reuses the same TLS connections"""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                headers={"User-Agent": "Mozilla/5.0"},
+                http2=HTTP2_AVAILABLE,
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency
+                )
+            )
+        return self.client
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = httpx.URL(url).host
+        if host not in self.breakers:
+            self.breakers[host] = CircuitBreaker()
+        return self.breakers[host]
+
+    async def fetch_price(self, client: httpx.AsyncClient, ticker: str, deadline: float) -> float | None:
+        """
+        Fetch stock price from Google Finance. Throttling (429/5xx/timeouts) shrinks the
+        concurrency limit and is retried with jitter while the cycle deadline allows.
+        """
+        url = f"{self.base_url}/{ticker}:NSE"
+        breaker = self.breaker(url)
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.retries + 1):
+            if not breaker.allow():
+                return None
+            probe = breaker.state == CircuitBreaker.HALF_OPEN
+            try:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.deadline_misses += 1
+                    return None
+
+                retry_after = None
+                try:
+                    await asyncio.wait_for(self.limiter.acquire(), remaining)
+                except asyncio.TimeoutError:
+                    self.deadline_misses += 1
+                    return None
+                outcome = ERROR
+                r = None
+                try:
+                    r = await client.get(url, timeout=min(self.timeout, max(0.1, deadline - loop.time())))
+                    if r.status_code == 200:
+                        outcome = SUCCESS
+                    elif r.status_code == 429 or r.status_code >= 500:
+                        outcome = OVERLOAD
+                        retry_after = _retry_after(r)
+                        self.last_error = f"HTTP {r.status_code}"
+                    else:
+                        self.last_error = f"HTTP {r.status_code}"
+                except (httpx.TimeoutException, httpx.TransportError) as e:
+                    outcome = OVERLOAD
+                    self.last_error = repr(e)
+                except Exception as e:
+                    self.last_error = repr(e)
+                finally:
+                    await self.limiter.release(outcome)
+
+                if outcome == SUCCESS:
+                    breaker.record_success()
+                    price = self.extractor.extract_fast(r.text)
+                    if price is None:
+                        # Full parse is CPU bound, keep it off the event loop
+                        price = await loop.run_in_executor(None, self.extractor.extract_fallback, r.text)
+                    return price
+
+                self.errors += 1
+                if outcome != OVERLOAD:
+                    if r is not None:
+                        # The host answered (e.g. 404), so it is not overloaded
+                        breaker.record_success()
+                    # A 404 or similar will not get better on retry
+                    return None
+                breaker.record_failure()
+                delay = backoff_delay(attempt, self.retry_backoff, retry_after)
+                if attempt == self.retries or loop.time() + delay >= deadline:
+                    return None
+                self.retried += 1
+                await asyncio.sleep(delay)
+            finally:
+                if probe:
+                    # Deadline, limiter timeout, no response or cancellation: never stay half open
+                    breaker.release_probe()
+        return None
+
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        client = self.get_client()
+        deadline = asyncio.get_running_loop().time() + self.cycle_deadline
+
+        async def fetch_one(ticker: str):
+            return ticker, await self.fetch_price(client, ticker, deadline)
+
+        self.requests += len(tickers)
+        results = {ticker: price for ticker, price in await asyncio.gather(*(fetch_one(t) for t in tickers)) if price is not None}
+        self.prices += len(results)
+        return results
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "extractor": self.extractor.stats(),
+            "concurrency": self.limiter.stats(),
+            "breakers": {host: breaker.stats() for host, breaker in self.breakers.items()},
+            "retried": self.retried,
+            "deadline_misses": self.deadline_misses,
+        }
+
+# ------------------ YFINANCE ------------------
+class YFinanceSource(PriceSource):
+    """Whole batch in one yfinance download of today's 1m bars; last close per symbol"""
+    name = "yfinance"
+
+    def __init__(self):
+        super().__init__()
+        self.breaker = CircuitBreaker()
+
+    def download(self, tickers: List[str]) -> Dict[str, float]:
+        symbols = [f"{ticker}.NS" for ticker in tickers]
+        data_frame = yf.download(symbols, period="1d", interval="1m", progress=False, auto_adjust=False)['Close']
+        results = {}
+        for ticker, symbol in zip(tickers, symbols):
+            if symbol not in data_frame:
+                continue
+            closes = data_frame[symbol].dropna()
+            if len(closes):
+                results[ticker] = round(float(closes.iloc[-1]), 2)
+        return results
+
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        if not self.breaker.allow():
+            return {}
+        self.requests += 1
+        loop = asyncio.get_running_loop()
+        try:
+            results = await loop.run_in_executor(None, self.download, tickers)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = repr(e)
+            self.breaker.record_failure()
+            return {}
+        self.breaker.record_success()
+        self.prices += len(results)
+        return results
+
+    def stats(self) -> dict:
+        return {**super().stats(), "breaker": self.breaker.stats()}
+
+# ------------------ SIMULATED ------------------
+class SimulatedSource(PriceSource):
+    """
+    Offline feed for load tests. Without a replay day every ticker follows its own
+    geometric random walk: the start price is derived from the ticker name and the
+    steps come from one seeded generator, so the same sequence of fetches always gives
+    the same prices. Thousands of tickers cost one vectorised draw per fetch.
+
+    With replay_day, each fetch advances one cycle of that day's tick log instead and
+    wraps around at the end; id_names maps the log's stock ids back to tickers.
+    """
+    name = "simulated"
+
+    def __init__(self, seed: int = SIMULATED_SEED, volatility: float = SIMULATED_VOLATILITY,
+                 replay_day: datetime.date | None = None, id_names: Dict[int, str] | None = None):
+        super().__init__()
+        self.seed = seed
+        self.volatility = volatility
+        self.rng = np.random.default_rng(seed)
+        self.walk: Dict[str, float] = {}
+        self.replay_day = replay_day
+        self.id_names = id_names or {}
+        self._cycles = None
+
+    def start_price(self, ticker: str) -> float:
+        return 100.0 + (zlib.crc32(f"{self.seed}:{ticker}".encode()) % 490000) / 100
+
+    def random_walk(self, tickers: List[str]) -> Dict[str, float]:
+        prices = np.array([self.walk.get(t) or self.start_price(t) for t in tickers], dtype=np.float64)
+        prices *= np.exp(self.rng.normal(0.0, self.volatility, len(prices)))
+        self.walk.update(zip(tickers, prices.tolist()))
+        return {ticker: round(price, 2) for ticker, price in zip(tickers, prices.tolist())}
+
+    def replay(self, tickers: List[str]) -> Dict[str, float]:
+        if self._cycles is None:
+            self._cycles = TickLogReader(self.replay_day).ticks()
+        records = next(self._cycles, None)
+        if records is None:
+            self._cycles = TickLogReader(self.replay_day).ticks()
+            records = next(self._cycles, None)
+            if records is None:
+                return {}
+        _, records = records
+        wanted = set(tickers)
+        results = {}
+        for sid, price in zip(records["stock_id"].tolist(), records["price"].tolist()):
+            ticker = self.id_names.get(sid)
+            if ticker in wanted:
+                results[ticker] = round(price, 2)
+        return results
+
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        self.requests += 1
+        try:
+            results = self.replay(tickers) if self.replay_day else self.random_walk(tickers)
+        except Exception as e:
+            self.errors += 1
+            self.last_error = repr(e)
+            return {}
+        self.prices += len(results)
+        return results
+
+# ------------------ FAILOVER ------------------
+class FailoverSource(PriceSource):
+    """
+    Tries each source in order; tickers a source could not price (it failed or left
+    them out) are passed on to the next one. The first source wins for everything it returns.
+    """
+    name = "failover"
+
+    def __init__(self, sources: List[PriceSource]):
+        super().__init__()
+        self.sources = sources
+        self.served: Dict[str, int] = {source.name: 0 for source in sources}
+
+    async def fetch(self, tickers: List[str]) -> Dict[str, float]:
+        self.requests += 1
+        results: Dict[str, float] = {}
+        remaining = list(tickers)
+        for source in self.sources:
+            if not remaining:
+                break
+            try:
+                prices = await source.fetch(remaining)
+            except Exception as e:
+                source.errors += 1
+                source.last_error = repr(e)
+                prices = {}
+            if prices:
+                self.served[source.name] += len(prices)
+                results.update(prices)
+                remaining = [t for t in remaining if t not in prices]
+        self.prices += len(results)
+        return results
+
+    async def close(self):
+        for source in self.sources:
+            await source.close()
+
+    def stats(self) -> dict:
+        return {
+            **super().stats(),
+            "served": self.served,
+            "sources": [source.stats() for source in self.sources],
+        }
+
+SOURCES = {
+    GoogleFinanceSource.name: GoogleFinanceSource,
+    YFinanceSource.name: YFinanceSource,
+    SimulatedSource.name: SimulatedSource,
+}
+
+def build_price_source(names: str, id_names: Dict[int, str] | None = None) -> PriceSource:
+    """
+    Comma-separated source names in failover order, e.g. "google,yfinance".
+    A single name gives that source directly.
+    """
+    sources = []
+    for name in (n.strip() for n in names.split(",")):
+        if not name:
+            continue
+        if name not in SOURCES:
+            raise ValueError(f"Unknown price source '{name}', expected one of {sorted(SOURCES)}")
+        if name == SimulatedSource.name:
+            replay_day = datetime.date.fromisoformat(SIMULATED_REPLAY_DAY) if SIMULATED_REPLAY_DAY else None
+            sources.append(SimulatedSource(replay_day=replay_day, id_names=id_names))
+        else:
+            sources.append(SOURCES[name]())
+    if not sources:
+        raise ValueError("No price source configured")
+    return sources[0] if len(sources) == 1 else FailoverSource(sources)
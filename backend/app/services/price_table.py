@@ -0,0 +1,107 @@
+import numpy as np
+from collections.abc import Mapping
+from typing import Dict, Iterator, List
+
+# Growth step for the id-indexed arrays, so a reload with a few new ids does not reallocate each time
+GROW_BY = 1024
+
+# ------------------ PRICE TABLE ------------------
+class PriceTable(Mapping):
+    """
+    Latest quote per stock, stored column-wise in NumPy arrays indexed by stock_id:
+    price, prev_close and day_change as float64, the fetch time as float64 and a
+    present flag = 33 bytes per slot, plus the shared ticker name.
+
+    Reads still look like the old dict of dicts: table.get(sid, {}).get("price"),
+    items() and update({sid: {...}}) work unchanged, but the per-stock dict is built
+    on access instead of being kept around for every ticker.
+    """
+
+    def __init__(self, capacity: int = GROW_BY):
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.prev_close = np.zeros(capacity, dtype=np.float64)
+        self.day_change = np.zeros(capacity, dtype=np.float64)
+        self.updated_at = np.zeros(capacity, dtype=np.float64)
+        self.present = np.zeros(capacity, dtype=bool)
+        self.names: List[str | None] = [None] * capacity
+        self.count = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.price)
+
+    def reserve(self, max_stock_id: int):
+        """Makes room for ids up to max_stock_id"""
+        if max_stock_id < self.capacity:
+            return
+        size = (max_stock_id // GROW_BY + 1) * GROW_BY
+        for column in ("price", "prev_close", "day_change", "updated_at", "present"):
+            old = getattr(self, column)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+        self.names.extend([None] * (size - len(self.names)))
+
+    def set(self, sid: int, name: str, price: float, prev_close: float = 0.0, day_change: float = 0.0, ts: float = 0.0):
+        if sid >= self.capacity:
+            self.reserve(sid)
+        if not self.present[sid]:
+            self.present[sid] = True
+            self.count += 1
+        self.names[sid] = name
+        self.price[sid] = price
+        self.prev_close[sid] = prev_close
+        self.day_change[sid] = day_change
+        self.updated_at[sid] = ts
+
+    def update(self, quotes: Dict[int, Dict], ts: float = 0.0):
+        for sid, stock in quotes.items():
+            self.set(
+                sid, stock.get("name"), stock["price"],
+                stock.get("prev_close", 0.0), stock.get("day_change", 0.0), ts
+            )
+
+    def retain(self, stock_ids):
+        """Drops every quote whose id is not in stock_ids, e.g. after a universe reload"""
+        keep = np.zeros(self.capacity, dtype=bool)
+        ids = np.fromiter((sid for sid in stock_ids if sid < self.capacity), dtype=np.int64)
+        keep[ids] = True
+        dropped = self.present & ~keep
+        for sid in np.flatnonzero(dropped).tolist():
+            self.names[sid] = None
+        self.present &= keep
+        self.count = int(self.present.sum())
+
+    def clear(self):
+        self.present[:] = False
+        self.names = [None] * self.capacity
+        self.count = 0
+
+    def __getitem__(self, sid: int) -> Dict:
+        if sid not in self:
+            raise KeyError(sid)
+        sid = int(sid)
+        return {
+            "stock_id": sid,
+            "name": self.names[sid],
+            "price": float(self.price[sid]),
+            "prev_close": float(self.prev_close[sid]),
+            "day_change": float(self.day_change[sid]),
+        }
+
+    def __contains__(self, sid) -> bool:
+        try:
+            return 0 <= sid < self.capacity and bool(self.present[sid])
+        except (TypeError, IndexError):
+            return False
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(np.flatnonzero(self.present).tolist())
+
+    def __len__(self) -> int:
+        return self.count
+
+    def memory_bytes(self) -> int:
+        arrays = self.price.nbytes + self.prev_close.nbytes + self.day_change.nbytes + self.updated_at.nbytes + self.present.nbytes
+        # The names list holds one pointer per slot; the strings are shared with the universe
+        return arrays + 8 * len(self.names)
@@ -0,0 +1,207 @@
+import bisect
+import datetime
+import time
+from typing import Callable, Dict, List
+from app.core.config import SCRAPER_INTERVAL, SCRAPER_MAX_INTERVAL, SCRAPER_CYCLE_BUDGET
+from app.services.market_calendar import IST, is_trading_day
+
+# ------------------ NSE SESSIONS ------------------
+PRE_OPEN = "pre_open"
+CONTINUOUS = "continuous"
+CLOSED = "closed"
+
+PRE_OPEN_START = datetime.time(9, 0)
+CONTINUOUS_START = datetime.time(9, 15)
+MARKET_CLOSE = datetime.time(15, 30)
+
+# Pre-open only discovers one equilibrium price, no need to poll it hard
+PRE_OPEN_INTERVAL = 30.0
+# Longest sleep while closed, so stop/start requests are still noticed
+CLOSED_SLEEP = 60.0
+# Fetches a ticker gets in the closed refresh before it is given up on (e.g. delisted)
+CLOSED_ATTEMPTS = 3
+
+# EWMA of absolute per-poll returns (as a fraction) and the bands that map it to an interval
+VOLATILITY_ALPHA = 0.3
+ACTIVE_MOVE = 0.0005   # >= 5 bps per poll: poll every cycle
+CALM_MOVE = 0.0001     # <  1 bp per poll: back off towards SCRAPER_MAX_INTERVAL
+
+def market_session(now: datetime.datetime) -> str:
+    now = now.astimezone(IST)
+    if not is_trading_day(now.date()):
+        return CLOSED
+    if PRE_OPEN_START <= now.time() < CONTINUOUS_START:
+        return PRE_OPEN
+    if CONTINUOUS_START <= now.time() < MARKET_CLOSE:
+        return CONTINUOUS
+    return CLOSED
+
+def seconds_until_next_session(now: datetime.datetime) -> float:
+    now = now.astimezone(IST)
+    day = now.date()
+    while True:
+        start = datetime.datetime.combine(day, PRE_OPEN_START, IST)
+        if is_trading_day(day) and start > now:
+            return (start - now).total_seconds()
+        day += datetime.timedelta(days=1)
+
+# ------------------ ADAPTIVE SCHEDULER ------------------
+class PollScheduler:
+    """
+    Decides which tickers to fetch on each scraper cycle.
+
+    Closed: one refresh of every ticker (spread over as many budget-sized cycles as it
+    takes) so the cache is populated, then idle until the next pre-open.
+    Pre-open: every ticker every PRE_OPEN_INTERVAL.
+    Continuous: each ticker has its own interval. Tickers with resting triggers or their own
+    subscribers are polled every cycle; the rest scale with recent volatility, from every
+    cycle when moving to SCRAPER_MAX_INTERVAL when flat.
+
+    Whatever is due is then capped at `budget` requests per cycle by shard().
+    """
+
+    def __init__(self, base_interval: float = SCRAPER_INTERVAL, max_interval: float = SCRAPER_MAX_INTERVAL,
+                 budget: int = SCRAPER_CYCLE_BUDGET):
+        self.base_interval = base_interval
+        self.max_interval = max_interval
+        self.budget = budget
+        # Last id served by each rotation (demand, rest), so the next cycle starts after it
+        self._urgent_cursor = 0
+        self._cursor = 0
+        # stock_id -> bool; wired up by the scraper (trigger book / ticker subscribers)
+        self.has_demand: Callable[[int], bool] = lambda sid: False
+        self.next_due: Dict[int, float] = {}
+        self.volatility: Dict[int, float] = {}
+        self.last_price: Dict[int, float] = {}
+        self.session = None
+        self.closed_refreshed = False
+        # stock_id -> attempts left, for tickers the closed refresh has not priced yet
+        self.closed_pending: Dict[int, int] | None = None
+        self._pre_open_due = 0.0
+        self._reset_day(datetime.datetime.now(IST).date())
+
+    def _reset_day(self, day: datetime.date):
+        self.day = day
+        self.requests = 0
+        self.deferred = 0
+        self.baseline = 0.0
+        self._baseline_at = time.monotonic()
+
+    def interval(self, sid: int) -> float:
+        if self.has_demand(sid):
+            return self.base_interval
+        move = self.volatility.get(sid)
+        if move is None or move >= ACTIVE_MOVE:
+            return self.base_interval
+        if move < CALM_MOVE:
+            return self.max_interval
+        # Linear between the bands
+        share = (ACTIVE_MOVE - move) / (ACTIVE_MOVE - CALM_MOVE)
+        return self.base_interval + share * (self.max_interval - self.base_interval)
+
+    def due(self, stock_ids: List[int], now: datetime.datetime) -> List[int]:
+        """Tickers to fetch this cycle"""
+        if now.astimezone(IST).date() != self.day:
+            self._reset_day(now.astimezone(IST).date())
+
+        session = market_session(now)
+        if session != self.session:
+            self.session = session
+            self.closed_refreshed = False
+            self.closed_pending = None
+            self._pre_open_due = 0.0
+
+        clock = time.monotonic()
+        if session == CLOSED:
+            if self.closed_refreshed:
+                return []
+            if self.closed_pending is None:
+                self.closed_pending = dict.fromkeys(stock_ids, CLOSED_ATTEMPTS)
+            return [sid for sid in stock_ids if sid in self.closed_pending]
+        if session == PRE_OPEN:
+            return list(stock_ids) if clock >= self._pre_open_due else []
+        return [sid for sid in stock_ids if self.next_due.get(sid, 0.0) <= clock]
+
+    @staticmethod
+    def _rotate(ids: List[int], cursor: int, count: int) -> List[int]:
+        """Up to count of ids, in id order starting after cursor and wrapping around"""
+        ids = sorted(ids)
+        start = bisect.bisect_right(ids, cursor)
+        return (ids[start:] + ids[:start])[:count]
+
+    def shard(self, due: List[int]) -> List[int]:
+        """
+        Caps a cycle at the request budget. Tickers with demand go first, the rest fill what
+        is left. Each group rotates on from where the previous cycle stopped, so a demanded
+        ticker is reached within ceil(demanded / budget) cycles even when demand alone
+        exceeds the budget. Tickers left out are still due next cycle.
+        """
+        if self.budget <= 0 or len(due) <= self.budget:
+            return due
+        urgent, rest = [], []
+        for sid in due:
+            (urgent if self.has_demand(sid) else rest).append(sid)
+
+        urgent = self._rotate(urgent, self._urgent_cursor, self.budget)
+        if urgent:
+            self._urgent_cursor = urgent[-1]
+        picked = self._rotate(rest, self._cursor, self.budget - len(urgent))
+        if picked:
+            self._cursor = picked[-1]
+        self.deferred += len(due) - len(urgent) - len(picked)
+        return urgent + picked
+
+    def record(self, requested: List[int], prices: Dict[int, float]):
+        """Updates volatility and next due time after a fetch. Failed tickers retry next cycle."""
+        clock = time.monotonic()
+        self.requests += len(requested)
+        if self.session == CLOSED and self.closed_pending is not None:
+            # Done once every ticker is priced (or out of attempts), however many shards that took
+            for sid in requested:
+                attempts = self.closed_pending.get(sid)
+                if attempts is None:
+                    continue
+                if sid in prices or attempts <= 1:
+                    del self.closed_pending[sid]
+                else:
+                    self.closed_pending[sid] = attempts - 1
+            self.closed_refreshed = not self.closed_pending
+        elif self.session == PRE_OPEN:
+            self._pre_open_due = clock + PRE_OPEN_INTERVAL
+
+        for sid in requested:
+            price = prices.get(sid)
+            if price is None:
+                self.next_due[sid] = clock
+                continue
+            previous = self.last_price.get(sid)
+            if previous:
+                move = abs(price - previous) / previous
+                old = self.volatility.get(sid, move)
+                self.volatility[sid] = VOLATILITY_ALPHA * move + (1 - VOLATILITY_ALPHA) * old
+            self.last_price[sid] = price
+            self.next_due[sid] = clock + self.interval(sid)
+
+    def sleep_time(self, now: datetime.datetime) -> float:
+        if market_session(now) == CLOSED and self.closed_refreshed:
+            return min(CLOSED_SLEEP, max(self.base_interval, seconds_until_next_session(now)))
+        return self.base_interval
+
+    def stats(self, universe_size: int) -> dict:
+        # Baseline: the old loop, every ticker every base interval around the clock
+        clock = time.monotonic()
+        self.baseline += universe_size * (clock - self._baseline_at) / self.base_interval
+        self._baseline_at = clock
+        return {
+            "session": self.session,
+            "date": self.day.isoformat(),
+            "requests_today": self.requests,
+            "baseline_requests_today": int(self.baseline),
+            "requests_saved_today": max(0, int(self.baseline) - self.requests),
+            "cycle_budget": self.budget,
+            "deferred_today": self.deferred,
+            "intervals": {
+                "min": min((self.interval(sid) for sid in self.last_price), default=self.base_interval),
+                "max": max((self.interval(sid) for sid in self.last_price), default=self.base_interval),
+            },
+        }
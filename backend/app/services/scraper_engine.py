@@ -1,17 +1,26 @@
 import asyncio
-import requests
-import json
-from fastapi import WebSocket
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, List
-from bs4 import BeautifulSoup
 import datetime
+import time
 from zoneinfo import ZoneInfo
 from .data_history import get_prev_close
+from .price_sources import build_price_source
+from .price_table import PriceTable
+from .connection_manager import ConnectionManager
+from .tick_history import tick_history
+from .tick_log import tick_log
+from .holdings import holdings_index
 from app.services.trigger import check_parallel_triggers
+from app.services import trigger as trigger_service
+from .scheduler import PollScheduler
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import SessionLocal
+from app.models.sql_models import Stock
+from app.core.config import PRICE_SOURCES
 
 # ------------------ CONFIG ------------------
+# Built-in universe, used until load_universe() reads the Stock table (and if it is empty)
 TICKERS = [
     "ADANIENT", "ADANIPORTS", "APOLLOHOSP", "ASIANPAINT", "AXISBANK",
     "BAJAJ-AUTO", "BAJAJFINSV", "BAJFINANCE", "BEL", "BHARTIARTL",
@@ -29,104 +38,63 @@ TICKERS = [
 
 ID_MAP = {t: i + 1 for i, t in enumerate(TICKERS)}
 ID_MAP_REVERSE = {v: k for k, v in ID_MAP.items()}
+# Bumped by load_universe() so the loop knows to fetch previous closes for new tickers
+UNIVERSE_VERSION = 0
 
-MAX_WORKERS = 10
-PRICE_CLASS = "YMlKec fxKbKc"
-HEADERS = {"User-Agent": "Mozilla/5.0"}
-
-CACHE: Dict[int, Dict[str, Any]] = {}
+# Latest quote per stock_id; reads like the old {sid: {"price": ...}} dict
+CACHE = PriceTable()
 PREV_CLOSE_CACHE = {} 
 LAST_REFRESH_DATE = None
 SCRAPER_RUNNING = True
 
-EXECUTOR = ThreadPoolExecutor(max_workers=MAX_WORKERS)
+PRICE_SOURCE = build_price_source(PRICE_SOURCES, ID_MAP_REVERSE)
 
 # ------------------ WEBSOCKET MANAGER ------------------
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-        self.user_connections: Dict[int, WebSocket] = {}
-
-    # FIX 1: Add user_id parameter here
-    async def connect(self, websocket: WebSocket, user_id: int = None):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        
-        # FIX 2: Store the user connection if user_id is provided
-        if user_id is not None:
-            self.user_connections[user_id] = websocket
-            print(f"User {user_id} connected to private channel")
-
-        # Send initial data if available
-        # (Assuming CACHE is defined globally in this file)
-        if 'CACHE' in globals() and globals()['CACHE']:
-             try:
-                await websocket.send_text(json.dumps({"type": "update", "data": globals()['CACHE']}))
-             except Exception:
-                pass # Connection might be unstable, let disconnect handle it later
-
-    # FIX 3: Add user_id to disconnect logic
-    def disconnect(self, websocket: WebSocket, user_id: int = None):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        
-        if user_id and user_id in self.user_connections:
-            del self.user_connections[user_id]
-
-    async def broadcast(self, message: str):
-        dead = []
-        for ws in self.active_connections:
-            try:
-                await ws.send_text(message)
-            except Exception:
-                dead.append(ws)
-        for ws in dead:
-            self.active_connections.remove(ws)
-
-    # FIX 4: Renamed to match trigger.py calls
-    async def send_personal_message(self, message: dict, user_id: int):
-        if user_id in self.user_connections:
-            websocket = self.user_connections[user_id]
-            try:
-                await websocket.send_json(message)
-            except Exception as e:
-                print(f"Failed to send personal message to {user_id}: {e}")
-                # Optional: cleanup if dead
-                # del self.user_connections[user_id]
-
 manager = ConnectionManager()
 
+# ------------------ POLL SCHEDULER ------------------
+SCHEDULER = PollScheduler()
+# Tickers someone is waiting on: resting trigger orders or per-ticker subscribers
+SCHEDULER.has_demand = lambda sid: bool(trigger_service.trigger_cache.get(str(sid))) or sid in manager.topics
+
+# ------------------ UNIVERSE ------------------
+async def load_universe(db: AsyncSession) -> int:
+    """
+    Tracks every ticker in the Stock table. TICKERS / ID_MAP / ID_MAP_REVERSE are updated
+    in place, since other modules hold references to them. Safe to call while the loop runs.
+    """
+    global UNIVERSE_VERSION
+    result = await db.execute(select(Stock.stock_id, Stock.name).order_by(Stock.stock_id))
+    rows = result.all()
+    if not rows:
+        print("Stock table is empty, keeping the built-in ticker list")
+        return len(TICKERS)
+
+    TICKERS[:] = [name for _, name in rows]
+    ID_MAP.clear()
+    ID_MAP.update({name: sid for sid, name in rows})
+    ID_MAP_REVERSE.clear()
+    ID_MAP_REVERSE.update({sid: name for sid, name in rows})
+    CACHE.reserve(max(ID_MAP_REVERSE))
+    CACHE.retain(ID_MAP_REVERSE)
+    UNIVERSE_VERSION += 1
+    print(f"Universe loaded: {len(TICKERS)} tickers")
+    return len(TICKERS)
+
 # ------------------ SCRAPER FUNCTIONS ------------------
-def fetch_price(ticker: str) -> float | None:
-    """Fetch stock price from Google Finance"""
-    url = f"https://www.google.com/finance/quote/{ticker}:NSE"
-    try:
-        r = requests.get(url, headers=HEADERS, timeout=5)
-        if r.status_code != 200:
-            return None
-        soup = BeautifulSoup(r.text, "html.parser")
-        tag = soup.find(class_=PRICE_CLASS)
-        if tag:
-            return float(tag.text.strip().replace("₹", "").replace(",", ""))
-    except Exception:
-        return None
-    return None
-
-def fetch_all() -> Dict[int, Dict[str, Any]]:
+async def close_price_source():
+    await PRICE_SOURCE.close()
 
+async def fetch_all(tickers: List[str] = None) -> Dict[int, Dict[str, Any]]:
+    """Quotes from the configured price source, keyed by stock_id"""
+    prices = await PRICE_SOURCE.fetch(tickers or TICKERS)
     results: Dict[int, Dict[str, Any]] = {}
-    futures = {EXECUTOR.submit(fetch_price, t): t for t in TICKERS}
-
-    for fut in as_completed(futures):
-        ticker = futures[fut]
-        try:
-            price = fut.result()
-        except Exception:
-            price = None
-        if price is not None:
-            sid = ID_MAP[ticker]
-            results[sid] = {"stock_id": sid, "name": ticker, "price": price}
-
+    for ticker, price in prices.items():
+        sid = ID_MAP.get(ticker)
+        if sid is None:
+            # Dropped by a universe reload while the fetch was in flight
+            continue
+        results[sid] = {"stock_id": sid, "name": ticker, "price": price}
     return results
 
 def calculate_day_change(current_data, previous_close_data):
@@ -144,39 +112,85 @@ def calculate_day_change(current_data, previous_close_data):
             stock["day_change"] = 0.0
     return current_data
 
+# ------------------ TICK PIPELINE ------------------
+async def push_portfolio_updates(market_prices):
+    """Re-values only the users holding a stock that moved and pushes them their new totals"""
+    touched = holdings_index.apply_prices(market_prices)
+    for user_id, changed in touched.items():
+        if user_id in manager.user_connections:
+            await manager.send_personal_message(holdings_index.summary(user_id, changed), user_id)
+
+async def process_tick(new_data, prev_close_data, ts: float = None, session_factory=SessionLocal) -> Dict[str, float]:
+    """
+    day change -> cache/history -> triggers -> portfolio push -> broadcast for one batch of fetched prices.
+    Shared by scraper_loop and the replay runner (bench.replay). Returns per-stage latency in seconds,
+    plus 'fired', the number of trigger orders executed.
+    """
+    timings = {}
+
+    started = time.perf_counter()
+    new_data = calculate_day_change(new_data, prev_close_data)
+    timings["day_change"] = time.perf_counter() - started
+
+    if new_data:
+        # The scheduler fetches a subset per cycle; tickers not polled keep their last quote
+        ts = ts if ts is not None else time.time()
+        CACHE.update(new_data, ts)
+        tick_history.append(new_data, ts)
+
+        started = time.perf_counter()
+        async with session_factory() as db:
+            timings["fired"] = await check_parallel_triggers(db, new_data)
+        timings["triggers"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        await push_portfolio_updates(new_data)
+        timings["portfolio"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        # Only this tick's quotes can differ from what was last published
+        await manager.publish_market(new_data)
+        timings["broadcast"] = time.perf_counter() - started
+
+    return timings
+
 # ------------------ SCRAPER LOOP ------------------
 async def scraper_loop():
     """Main scraper loop: fetch prices and broadcast"""
-    global CACHE, PREV_CLOSE_CACHE, LAST_REFRESH_DATE, SCRAPER_RUNNING
+    global PREV_CLOSE_CACHE, LAST_REFRESH_DATE, SCRAPER_RUNNING
     loop = asyncio.get_running_loop()
     ist = ZoneInfo("Asia/Kolkata")
     print("Scraper loop started")
 
     PREV_CLOSE_DATA = {} 
+    prev_close_version = UNIVERSE_VERSION
 
     while SCRAPER_RUNNING:
         now = datetime.datetime.now(ist)
 
 
         if LAST_REFRESH_DATE != now.date() and now.hour >= 9:
-            PREV_CLOSE_DATA = await loop.run_in_executor(None, get_prev_close, TICKERS, ID_MAP)
+            PREV_CLOSE_DATA = await loop.run_in_executor(None, get_prev_close, list(TICKERS), dict(ID_MAP))
             LAST_REFRESH_DATE = now.date()
+            prev_close_version = UNIVERSE_VERSION
+            tick_history.reset()
         
-        # Initial run fallback
-        if not PREV_CLOSE_DATA:
-            PREV_CLOSE_DATA = await loop.run_in_executor(None, get_prev_close, TICKERS, ID_MAP)
-
-        new_data = await loop.run_in_executor(EXECUTOR, fetch_all)
-        new_data = calculate_day_change(new_data, PREV_CLOSE_DATA)
-
-        if new_data:
-            CACHE = new_data
-
-            async with SessionLocal() as db:
-                await check_parallel_triggers(db, new_data)
-
-            await manager.broadcast(json.dumps({"type": "update", "data": CACHE}))
-
-        await asyncio.sleep(2)
+        # Initial run fallback, and new tickers after a universe reload
+        if not PREV_CLOSE_DATA or prev_close_version != UNIVERSE_VERSION:
+            PREV_CLOSE_DATA = await loop.run_in_executor(None, get_prev_close, list(TICKERS), dict(ID_MAP))
+            prev_close_version = UNIVERSE_VERSION
+
+        due = SCHEDULER.shard(SCHEDULER.due(list(ID_MAP_REVERSE), now))
+        if due:
+            new_data = await fetch_all([ID_MAP_REVERSE[sid] for sid in due])
+            fetched_at = time.time()
+            SCHEDULER.record(due, {sid: stock["price"] for sid, stock in new_data.items()})
+            if tick_log is not None:
+                tick_log.append(new_data, fetched_at)
+
+            await process_tick(new_data, PREV_CLOSE_DATA, fetched_at)
+
+        # Idle outside market hours, one base interval otherwise
+        await asyncio.sleep(SCHEDULER.sleep_time(now))
 
     print("Scraper loop stopped")
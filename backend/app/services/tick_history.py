@@ -0,0 +1,126 @@
+import numpy as np
+from typing import Dict, List
+from app.core.config import TICK_HISTORY_CAPACITY
+
+# Candle intervals served by /api/market/candles, in seconds
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900}
+# Ticks a new ring holds before its first doubling
+INITIAL_RING_SIZE = 256
+
+# ------------------ RING BUFFER ------------------
+class TickRing:
+    """
+    Bounded ring of (timestamp, price) for one ticker, stored in two contiguous
+    NumPy arrays: float64 epoch seconds + float32 price = 12 bytes per tick.
+    The arrays start small and double until they reach capacity, so tickers the
+    scheduler polls rarely stay small; once full, the oldest ticks are overwritten.
+    """
+    __slots__ = ("ts", "price", "head", "size", "capacity")
+
+    def __init__(self, capacity: int, initial: int = INITIAL_RING_SIZE):
+        self.capacity = capacity
+        self.ts = np.zeros(min(capacity, initial), dtype=np.float64)
+        self.price = np.zeros(min(capacity, initial), dtype=np.float32)
+        self.head = 0
+        self.size = 0
+
+    def append(self, ts: float, price: float):
+        if self.size == len(self.ts) < self.capacity:
+            # Not wrapped yet, so the ticks are in order and head is at the end
+            grown = min(self.capacity, 2 * len(self.ts))
+            self.ts = np.concatenate((self.ts, np.zeros(grown - len(self.ts), dtype=np.float64)))
+            self.price = np.concatenate((self.price, np.zeros(grown - len(self.price), dtype=np.float32)))
+            self.head = self.size
+        self.ts[self.head] = ts
+        self.price[self.head] = price
+        self.head = (self.head + 1) % len(self.ts)
+        self.size = min(self.size + 1, len(self.ts))
+
+    def oldest(self) -> float | None:
+        if self.size == 0:
+            return None
+        return float(self.ts[(self.head - self.size) % len(self.ts)])
+
+    def window(self, since: float = 0.0):
+        """Ticks with ts >= since, oldest first"""
+        if self.size < len(self.ts):
+            ts, price = self.ts[:self.size], self.price[:self.size]
+        else:
+            ts = np.concatenate((self.ts[self.head:], self.ts[:self.head]))
+            price = np.concatenate((self.price[self.head:], self.price[:self.head]))
+        start = int(np.searchsorted(ts, since, side="left"))
+        return ts[start:], price[start:]
+
+def resample(ts: np.ndarray, price: np.ndarray, seconds: int) -> List[dict]:
+    """Vectorized OHLC: one candle per bucket of `seconds`, buckets aligned to the epoch"""
+    if len(ts) == 0:
+        return []
+    buckets = (ts // seconds) * seconds
+    starts = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+    ends = np.append(starts[1:], len(ts))
+    highs = np.maximum.reduceat(price, starts)
+    lows = np.minimum.reduceat(price, starts)
+    return [
+        {
+            "time": int(buckets[s]),
+            "open": round(float(price[s]), 2),
+            "high": round(float(h), 2),
+            "low": round(float(l), 2),
+            "close": round(float(price[e - 1]), 2),
+            "ticks": int(e - s),
+        }
+        for s, e, h, l in zip(starts, ends, highs, lows)
+    ]
+
+# ------------------ INTRADAY HISTORY ------------------
+class TickHistory:
+    """
+    Intraday ticks for every stock plus a per-(stock, interval) candle cache.
+    A candle is cached once its bucket has closed; only the open bucket is rebuilt per request.
+    """
+
+    def __init__(self, capacity: int = TICK_HISTORY_CAPACITY):
+        self.capacity = capacity
+        self.rings: Dict[int, TickRing] = {}
+        # (stock_id, seconds) -> (closed candles, start of the first bucket not yet closed)
+        self.closed: Dict[tuple, tuple[List[dict], float]] = {}
+
+    def reset(self):
+        """New session: drop yesterday's ticks"""
+        self.rings = {}
+        self.closed = {}
+
+    def append(self, market_prices: dict, ts: float):
+        for sid, stock in market_prices.items():
+            ring = self.rings.get(sid)
+            if ring is None:
+                ring = self.rings[sid] = TickRing(self.capacity)
+            ring.append(ts, stock["price"])
+
+    def memory_bytes(self) -> int:
+        return sum(ring.ts.nbytes + ring.price.nbytes for ring in self.rings.values())
+
+    def candles(self, stock_id: int, interval: str, now: float) -> List[dict]:
+        seconds = INTERVALS[interval]
+        ring = self.rings.get(stock_id)
+        if ring is None or ring.size == 0:
+            return []
+
+        cached, closed_until = self.closed.get((stock_id, seconds), ([], 0.0))
+        open_bucket = (now // seconds) * seconds
+
+        fresh = resample(*ring.window(closed_until), seconds)
+        newly_closed = [c for c in fresh if c["time"] < open_bucket]
+        if newly_closed:
+            cached = cached + newly_closed
+            closed_until = newly_closed[-1]["time"] + seconds
+
+        # Forget candles whose ticks have already been overwritten in the ring
+        oldest = ring.oldest()
+        if cached and cached[0]["time"] + seconds <= oldest:
+            cached = [c for c in cached if c["time"] + seconds > oldest]
+        self.closed[(stock_id, seconds)] = (cached, closed_until)
+
+        return cached + [c for c in fresh if c["time"] >= open_bucket]
+
+tick_history = TickHistory()
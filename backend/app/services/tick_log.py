@@ -0,0 +1,135 @@
+import datetime
+import os
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from zoneinfo import ZoneInfo
+from app.core.config import TICK_LOG_ENABLED, TICK_LOG_DIR, TICK_LOG_RETENTION_DAYS
+
+# One fixed 16-byte record per quote, little-endian, no header
+RECORD_DTYPE = np.dtype([("ts", "<f8"), ("stock_id", "<u4"), ("price", "<f4")])
+WRITE_BUFFER_BYTES = 1 << 20
+FLUSH_INTERVAL = 5.0
+
+IST = ZoneInfo("Asia/Kolkata")
+
+def log_path(day: datetime.date, directory: str = TICK_LOG_DIR) -> str:
+    return os.path.join(directory, f"ticks-{day.isoformat()}.bin")
+
+def prune_logs(today: datetime.date, retention_days: int, directory: str = TICK_LOG_DIR) -> int:
+    """Deletes day logs older than retention_days; returns how many were removed"""
+    if retention_days <= 0 or not os.path.isdir(directory):
+        return 0
+    oldest = today - datetime.timedelta(days=retention_days)
+    removed = 0
+    for name in os.listdir(directory):
+        if not (name.startswith("ticks-") and name.endswith(".bin")):
+            continue
+        try:
+            day = datetime.date.fromisoformat(name[6:-4])
+        except ValueError:
+            continue
+        if day < oldest:
+            os.remove(os.path.join(directory, name))
+            removed += 1
+    return removed
+
+# ------------------ WRITER ------------------
+class TickLogWriter:
+    """
+    Appends every fetched quote to the day's log file. Records are packed on the event
+    loop (one NumPy array per tick) and written by a single background thread, so file
+    I/O never blocks the loop and records stay in arrival order. Each new day's file
+    also prunes the days past retention_days.
+    """
+
+    def __init__(self, directory: str = TICK_LOG_DIR, retention_days: int = TICK_LOG_RETENTION_DAYS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tick-log")
+        self.records_written = 0
+        self.closed = False
+        self._file = None
+        self._day = None
+        self._last_flush = 0.0
+
+    def append(self, market_prices: dict, ts: float):
+        # A tick finishing during shutdown must not hit the stopped executor
+        if not market_prices or self.closed:
+            return
+        records = np.empty(len(market_prices), dtype=RECORD_DTYPE)
+        records["ts"] = ts
+        records["stock_id"] = list(market_prices.keys())
+        records["price"] = [stock["price"] for stock in market_prices.values()]
+        self.executor.submit(self._write, records, ts)
+
+    def _write(self, records: np.ndarray, ts: float):
+        day = datetime.datetime.fromtimestamp(ts, IST).date()
+        if day != self._day:
+            self._close_file()
+            os.makedirs(self.directory, exist_ok=True)
+            prune_logs(day, self.retention_days, self.directory)
+            self._file = open(log_path(day, self.directory), "ab", buffering=WRITE_BUFFER_BYTES)
+            self._day = day
+        self._file.write(records.tobytes())
+        self.records_written += len(records)
+
+        now = time.monotonic()
+        if now - self._last_flush >= FLUSH_INTERVAL:
+            self._file.flush()
+            self._last_flush = now
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def close(self):
+        """Flushes pending records and closes the file"""
+        if self.closed:
+            return
+        self.closed = True
+        self.executor.submit(self._close_file)
+        self.executor.shutdown(wait=True)
+
+# ------------------ READER ------------------
+class TickLogReader:
+    """
+    Memory-maps a day's log. Time-range reads are zero-copy views into the map since
+    records are appended in time order; selecting one ticker copies only its rows.
+    """
+
+    def __init__(self, day: datetime.date, directory: str = TICK_LOG_DIR):
+        path = log_path(day, directory)
+        # A crash mid-write can leave a partial trailing record; ignore it
+        count = os.path.getsize(path) // RECORD_DTYPE.itemsize
+        if count:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", shape=(count,))
+        else:
+            self.records = np.empty(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def between(self, start: float | None = None, end: float | None = None) -> np.ndarray:
+        """Records with start <= ts < end, as a view"""
+        ts = self.records["ts"]
+        lo = 0 if start is None else int(np.searchsorted(ts, start, side="left"))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, end, side="left"))
+        return self.records[lo:hi]
+
+    def ticker(self, stock_id: int, start: float | None = None, end: float | None = None) -> np.ndarray:
+        window = self.between(start, end)
+        return window[window["stock_id"] == stock_id]
+
+    def ticks(self, start: float | None = None, end: float | None = None):
+        """Yields (ts, records) per scrape cycle; each batch is a view into the map"""
+        window = self.between(start, end)
+        if len(window) == 0:
+            return
+        ts = window["ts"]
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(ts)) + 1, [len(ts)]))
+        for lo, hi in zip(bounds[:-1], bounds[1:]):
+            yield float(ts[lo]), window[lo:hi]
+
+tick_log = TickLogWriter() if TICK_LOG_ENABLED else None
@@ -0,0 +1,85 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable
+from app.core.config import CHAT_TOOL_WORKERS, CHAT_TOOL_CONCURRENCY, CHAT_TOOL_TIMEOUT
+
+# Per-tool overrides of CHAT_TOOL_TIMEOUT, in seconds
+TOOL_TIMEOUTS = {
+    "get_stock_price": 10.0,
+    "get_market_news": 15.0,
+    "check_my_portfolio": 5.0,
+}
+
+class ToolTimeout(Exception):
+    pass
+
+# ------------------ TOOL POOL ------------------
+class ToolPool:
+    """
+    Where chat tools do their I/O. Blocking calls (yfinance) run on a dedicated, bounded
+    thread pool instead of the default executor the scraper also uses; async calls run on
+    the loop. Either way a global semaphore caps tool calls in flight across all chats,
+    and each call gets its tool's timeout, queueing time included.
+    """
+
+    def __init__(self, workers: int = CHAT_TOOL_WORKERS, concurrency: int = CHAT_TOOL_CONCURRENCY):
+        self.executor = None
+        self.configure(workers, concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.timeouts = 0
+        self.total_seconds = 0.0
+
+    def configure(self, workers: int, concurrency: int):
+        """Sizes the pool; only while no tool call is running"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chat-tool")
+        self.workers = workers
+        self.concurrency = concurrency
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(self, tool: str, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Awaits call() under the global limit; raises ToolTimeout past the tool's timeout"""
+        timeout = TOOL_TIMEOUTS.get(tool, CHAT_TOOL_TIMEOUT)
+        started = time.perf_counter()
+
+        async def limited():
+            self.waiting += 1
+            try:
+                await self.semaphore.acquire()
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            try:
+                return await call()
+            finally:
+                self.in_flight -= 1
+                self.semaphore.release()
+
+        self.calls += 1
+        try:
+            return await asyncio.wait_for(limited(), timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            raise ToolTimeout(f"{tool} timed out after {timeout:.0f}s")
+        finally:
+            self.total_seconds += time.perf_counter() - started
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "calls": self.calls,
+            "timeouts": self.timeouts,
+            "avg_ms": round(1000 * self.total_seconds / self.calls, 1) if self.calls else 0.0,
+        }
+
+tool_pool = ToolPool()
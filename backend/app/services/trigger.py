@@ -1,15 +1,22 @@
-import asyncio
+import time
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.sql_models import OrderTrigger
-from app.crud.portfolio import buy_stock, sell_stock 
+from app.crud.portfolio import execute_trigger_batch
+from app.services.order_book import OrderBook
 
-# The 'trigger_cache' stores pending orders grouped by stock_id for O(1) lookup
-# Format: { "1": [OrderTrigger, OrderTrigger], "2": [...] }
+# The 'trigger_cache' stores pending orders in a price-indexed OrderBook per stock_id
+# Format: { "1": OrderBook(buys=[...], sells=[...]), "2": ... }
 
-# trigger_cache = { "101": [OrderTrigger(trigger_id=1, user_id=55, stock_id=101, type="B", target=140.00)] }
+# A tick only pops the orders whose target price was crossed, instead of walking every pending order.
 trigger_cache = {}
 
+# Orders whose execution raised sit out with exponential back-off instead of re-firing
+# every tick: trigger_id -> (failures, retry_at, order)
+retry_queue = {}
+RETRY_BASE_SECONDS = 2.0
+RETRY_MAX_SECONDS = 60.0
+
 async def initialize_trigger_cache(db: AsyncSession):
     """
     Loads all 'P' (Pending) triggers from TiDB into memory at server startup.
@@ -27,71 +34,96 @@ async def initialize_trigger_cache(db: AsyncSession):
     for order in pending_orders:
         stock_id_key = str(order.stock_id)
         if stock_id_key not in trigger_cache:
-            trigger_cache[stock_id_key] = []
-        trigger_cache[stock_id_key].append(order)
+            trigger_cache[stock_id_key] = OrderBook()
+        trigger_cache[stock_id_key].add(order)
     
 async def add_to_trigger_cache(new_order: OrderTrigger):
     """Adds a single new order to the memory cache immediately."""
     stock_id_key = str(new_order.stock_id)
     if stock_id_key not in trigger_cache:
-        trigger_cache[stock_id_key] = []
-    trigger_cache[stock_id_key].append(new_order)
+        trigger_cache[stock_id_key] = OrderBook()
+    trigger_cache[stock_id_key].add(new_order)
 
 async def check_parallel_triggers(db: AsyncSession, market_prices: dict):
-    """Iterates through market prices and fires parallel execution tasks for stocks that have active triggers."""
-    matching_tasks = []
+    """Matches market prices against every stock's book and executes everything that fired as one batch.
+    Returns the number of orders executed."""
+    fills = []
+    _requeue_due_retries()
     
     for stock_id, price_data in market_prices.items():
         # Only process if this stock has active triggers in our cache
-        stock_id_key = str(stock_id)
-        if stock_id_key in trigger_cache:
+        book = trigger_cache.get(str(stock_id))
+        if book:
             current_price = price_data["price"]
-            specific_stock_triggers = trigger_cache[stock_id_key]
-
-            matching_tasks.append(
-                _process_price_match(db, specific_stock_triggers, current_price)
-            )
+            fills.extend((order, current_price) for order in book.match(current_price))
     
-    if matching_tasks:
-        await asyncio.gather(*matching_tasks)
+    if not fills:
+        return 0
+    return await _process_fired_orders(db, fills)
 
-async def _process_price_match(db: AsyncSession, orders_list: list, current_price: float):
-    """Internal matching logic for a specific stock group."""
+async def _execute_isolating_failures(db: AsyncSession, fills: list):
+    """
+    Executes the fills as one batch. If the batch fails (e.g. one order violates a
+    constraint) it is split in halves and retried, so a single bad order costs a few
+    extra transactions instead of blocking every other fill.
+    Returns (executed, rejected, failed).
+    """
+    try:
+        executed, rejected = await execute_trigger_batch(db, fills)
+        return executed, rejected, []
+    except Exception as e:
+        await db.rollback()
+        if len(fills) == 1:
+            print(f"Trigger {fills[0][0].trigger_id} failed: {e}")
+            return [], [], fills
+    mid = len(fills) // 2
+    first = await _execute_isolating_failures(db, fills[:mid])
+    second = await _execute_isolating_failures(db, fills[mid:])
+    return tuple(a + b for a, b in zip(first, second))
+
+def _requeue_due_retries():
+    clock = time.monotonic()
+    for trigger_id, (_, retry_at, order) in list(retry_queue.items()):
+        if retry_at <= clock:
+            # Stays in retry_queue until it executes or is rejected, so failures keep counting
+            retry_queue[trigger_id] = (retry_queue[trigger_id][0], float("inf"), order)
+            trigger_cache[str(order.stock_id)].add(order)
+
+async def _process_fired_orders(db: AsyncSession, fills: list):
+    """Group-commits the fired orders of a tick; failed orders retry with back-off."""
     from app.services.scraper_engine import manager
-    for order in orders_list[:]:  
-        is_triggered = False
-        
-        # 'B' = BUY (Execute if market price is at or below target)
-        if order.order_type == "B" and current_price <= order.target_price:
-            is_triggered = True
-        # 'S' = SELL (Execute if market price is at or above target)
-        elif order.order_type == "S" and current_price >= order.target_price:
-            is_triggered = True
+    executed, rejected, failed = await _execute_isolating_failures(db, fills)
+
+    clock = time.monotonic()
+    for order, _ in failed:
+        failures = retry_queue.get(order.trigger_id, (0,))[0] + 1
+        delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (failures - 1))
+        retry_queue[order.trigger_id] = (failures, clock + delay, order)
 
-        if is_triggered:
-            try:
-                db.add(order)
-                # 1. Execute the trade via your CRUD logic
-                await manager.send_trigger_message(
-                    {
-                        "type": "ORDER_EXECUTED",
-                        "stock_id": order.stock_id,
-                        "price": current_price,
-                        "quantity": order.quantity,
-                        "side": order.order_type
-                    },
-                    user_id=order.user_id
-                )
-                if order.order_type == "B":
-                    await buy_stock(db, order.user_id, order.stock_id, order.quantity, current_price)
-                else:
-                    await sell_stock(db, order.user_id, order.stock_id, order.quantity, current_price)
-                
-                # 2. Persist status change to TiDB
-                order.status = "E"
-                await db.commit()
-                
-                # 3. Remove from memory cache
-                orders_list.remove(order)
-            except Exception as e:
-                print(f"Trade Execution Failed for User {order.user_id}: {e}")
\ No newline at end of file
+    for order, price in executed:
+        retry_queue.pop(order.trigger_id, None)
+        await manager.send_personal_message(
+            {
+                "type": "ORDER_EXECUTED",
+                "stock_id": order.stock_id,
+                "price": price,
+                "quantity": order.quantity,
+                "side": order.order_type
+            },
+            user_id=order.user_id
+        )
+    # Rejected orders are closed ('R') rather than re-fired on every tick
+    for order, price in rejected:
+        retry_queue.pop(order.trigger_id, None)
+        await manager.send_personal_message(
+            {
+                "type": "ORDER_REJECTED",
+                "stock_id": order.stock_id,
+                "price": price,
+                "quantity": order.quantity,
+                "side": order.order_type,
+                "reason": "Insufficient holdings"
+            },
+            user_id=order.user_id
+        )
+    return len(executed)
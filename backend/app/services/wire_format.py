@@ -0,0 +1,70 @@
+import zlib
+import orjson
+import ormsgpack
+from array import array
+from typing import Dict, Any
+
+# Negotiated per connection on /ws/market?encoding=...&compress=...
+ENCODINGS = ("json", "msgpack", "columnar")
+COMPRESSIONS = (None, "deflate")
+
+def _json(frame: dict) -> bytes:
+    return orjson.dumps(frame, option=orjson.OPT_NON_STR_KEYS)
+
+def _msgpack(frame: dict) -> bytes:
+    return ormsgpack.packb(frame, option=ormsgpack.OPT_NON_STR_KEYS)
+
+def _columnar(frame: dict) -> bytes:
+    """
+    Market frame as parallel arrays: uint32 stock ids and float32 prices/day changes
+    (little-endian). Static fields (name, prev_close) travel in the dictionary frame
+    instead of being repeated on every tick.
+    """
+    data: Dict[int, Dict[str, Any]] = frame.get("data", {})
+    sids = list(data)
+    columns = {
+        "type": frame["type"],
+        "seq": frame.get("seq"),
+        "full": frame.get("full"),
+        "dict": frame.get("dict"),
+        "ids": array("I", sids).tobytes(),
+        "price": array("f", (data[sid]["price"] for sid in sids)).tobytes(),
+        "day_change": array("f", (data[sid].get("day_change", 0.0) for sid in sids)).tobytes(),
+    }
+    return _msgpack(columns)
+
+class WireFormat:
+    """
+    How one client wants market frames: the encoding plus optional deflate.
+
+    compress=deflate is application-level compression, not the permessage-deflate
+    WebSocket extension: each market frame is one raw deflate stream (no zlib header,
+    wbits -15) sent as a binary message, which the client inflates itself, e.g. with
+    DecompressionStream("deflate-raw") or pako.inflateRaw. The extension would compress
+    per socket; this way a frame is compressed once for every client that wants it.
+    Control and private messages stay plain JSON text.
+    """
+
+    def __init__(self, encoding: str = "json", compress: str | None = None):
+        self.encoding = encoding if encoding in ENCODINGS else "json"
+        self.compress = compress if compress in COMPRESSIONS else None
+        self.key = (self.encoding, self.compress)
+
+    def encode(self, frame: dict) -> str | bytes:
+        """Encodes a market frame; the result is shared by every client with this format"""
+        if self.encoding == "columnar" and frame.get("type") == "update":
+            payload = _columnar(frame)
+        elif self.encoding == "json":
+            payload = _json(frame)
+        else:
+            payload = _msgpack(frame)
+
+        if self.compress == "deflate":
+            # Raw deflate stream, compressed once per frame instead of per socket
+            compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+            return compressor.compress(payload) + compressor.flush()
+        if self.encoding == "json":
+            return payload.decode()
+        return payload
+
+JSON_FORMAT = WireFormat()
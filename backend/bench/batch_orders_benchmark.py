@@ -0,0 +1,92 @@
+"""
+Latency of a basket through execute_order_batch against the same orders one by one.
+
+Runs on the shared engine (DATABASE_URL, an in-memory SQLite database unless set). For
+every basket size, a fresh user places N buys of distinct stocks as one all_or_nothing
+basket, and another fresh user places the same N buys through buy_stock, one commit
+each. --sell-share turns that share of each basket into sells of stock bought earlier,
+which exercises the row locking on existing holdings. Reports the median over --repeat
+runs.
+
+    python -m bench.batch_orders_benchmark
+    python -m bench.batch_orders_benchmark --sizes 1,10,100,200 --repeat 20 --sell-share 0.5
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import argparse
+import asyncio
+import itertools
+import time
+import numpy as np
+from sqlalchemy import insert
+
+from app.core.database import engine, SessionLocal
+from app.crud import portfolio as portfolio_crud
+from app.models.sql_models import Base, User
+
+def basket(size: int, sell_share: float) -> list:
+    """(stock_id, quantity, price, order_type) legs; sells are of stock seeded beforehand"""
+    sells = int(size * sell_share)
+    return [(1000 + i, 5, 100.0 + i, "S" if i < sells else "B") for i in range(size)]
+
+async def seed(user_id: int, legs: list):
+    """Holdings the sell legs draw from"""
+    buys = [(stock_id, 10, price, "B") for stock_id, _, price, order_type in legs if order_type == "S"]
+    if buys:
+        async with SessionLocal() as db:
+            await portfolio_crud.execute_order_batch(db, user_id, buys)
+
+async def run_batch(user_id: int, legs: list) -> float:
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        executed, rejected = await portfolio_crud.execute_order_batch(db, user_id, legs)
+        elapsed = time.perf_counter() - started
+    assert len(executed) == len(legs) and not rejected
+    return elapsed
+
+async def run_single(user_id: int, legs: list) -> float:
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        for stock_id, quantity, price, order_type in legs:
+            if order_type == "B":
+                await portfolio_crud.buy_stock(db, user_id, stock_id, quantity, price)
+            else:
+                await portfolio_crud.sell_stock(db, user_id, stock_id, quantity, price)
+        return time.perf_counter() - started
+
+async def main(args):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    sizes = [int(s) for s in args.sizes.split(",")]
+    users = itertools.count(1)
+    async with SessionLocal() as db:
+        total = len(sizes) * args.repeat * 2
+        await db.execute(insert(User), [{"user_id": u, "name": f"u{u}", "email": f"u{u}@bench", "password_hash": "-"} for u in range(1, total + 1)])
+        await db.commit()
+
+    print(f"{engine.url.drivername}, {args.repeat} runs per size, {int(100 * args.sell_share)}% sells")
+    for size in sizes:
+        legs = basket(size, args.sell_share)
+        batch, single = [], []
+        for _ in range(args.repeat):
+            user_id = next(users)
+            await seed(user_id, legs)
+            batch.append(await run_batch(user_id, legs))
+            user_id = next(users)
+            await seed(user_id, legs)
+            single.append(await run_single(user_id, legs))
+        batch_ms, single_ms = 1000 * np.median(batch), 1000 * np.median(single)
+        print(
+            f"{size:>5} legs: basket {batch_ms:8.1f} ms  one by one {single_ms:8.1f} ms  "
+            f"({single_ms / batch_ms:4.1f}x)  {1000 * batch_ms / size:7.0f} us/leg in the basket"
+        )
+    await engine.dispose()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="execute_order_batch vs per-order buy_stock/sell_stock")
+    parser.add_argument("--sizes", default="1,10,100")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--sell-share", type=float, default=0.0, help="Share of each basket that sells existing holdings")
+    asyncio.run(main(parser.parse_args()))
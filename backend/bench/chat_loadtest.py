@@ -0,0 +1,131 @@
+"""
+Offline load test for the chat agent.
+
+Runs N concurrent chat sessions through the real graph (agent -> tools -> compact,
+checkpointer, tool pool) with the LLM, Tavily and yfinance replaced by stubs that only
+sleep for a configurable latency, and reports turn throughput, latency and event loop lag.
+
+    python -m bench.chat_loadtest --sessions 200 --turns 5
+    python -m bench.chat_loadtest --sessions 50 --market-latency 2 --tool-workers 4
+
+The market stub blocks its thread like yfinance does, so it exercises the tool pool.
+"""
+import os
+
+# The agent module builds its LLM client and the shared DB engine at import
+os.environ.setdefault("GROQ_API_KEY", "stub")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import argparse
+import asyncio
+import random
+import time
+import numpy as np
+from langchain_core.messages import AIMessage, ToolMessage
+
+from app.services import chat_agent, market_data, scraper_engine
+from app.services.tool_pool import tool_pool
+
+# ------------------ STUB BACKENDS ------------------
+class StubModel:
+    """Asks for one tool per question, then answers from its result"""
+
+    def __init__(self, latency: float, news_share: float, rng: random.Random):
+        self.latency = latency
+        self.news_share = news_share
+        self.rng = rng
+        self.calls = 0
+
+    def bind_tools(self, tools):
+        return self
+
+    async def ainvoke(self, messages):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        usage = {"input_tokens": sum(len(str(m.content)) for m in messages) // 4, "output_tokens": 20, "total_tokens": 0}
+        if isinstance(messages[-1], ToolMessage):
+            return AIMessage(content=f"Here is what I found: {messages[-1].content[:60]}", usage_metadata=usage)
+
+        if self.rng.random() < self.news_share:
+            call = {"name": "get_market_news", "args": {"query": "why is the market moving"}}
+        else:
+            call = {"name": "get_stock_price", "args": {"ticker": self.rng.choice(scraper_engine.TICKERS)}}
+        call["id"] = f"call_{self.calls}"
+        return AIMessage(content="", tool_calls=[call], usage_metadata=usage)
+
+class StubNews:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def search(self, query: str, **kwargs):
+        await asyncio.sleep(self.latency)
+        return {"results": [{"title": "Markets", "content": "x" * 2000, "url": "https://example.com"}]}
+
+def stub_download(latency: float):
+    def download(tickers):
+        # Blocks its thread like a real yfinance call
+        time.sleep(latency)
+        return {t: (("10-16 10:15", 100.0), ("10-16 15:15", 101.5)) for t in tickers}
+    return download
+
+# ------------------ RUNNER ------------------
+async def measure_loop_lag(samples: list, interval: float = 0.05):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+async def session(user_id: int, turns: int, latencies: list, errors: list):
+    for turn in range(turns):
+        started = time.perf_counter()
+        async for event in chat_agent.stream_bot_response(f"question {turn}", None, user_id):
+            if event["type"] == "error":
+                errors.append(event["detail"])
+        latencies.append(time.perf_counter() - started)
+
+async def main(args):
+    rng = random.Random(args.seed)
+    chat_agent.model = StubModel(args.llm_latency, args.news_share, rng)
+    chat_agent.news_client = StubNews(args.news_latency)
+    market_data.download_history = stub_download(args.market_latency)
+    market_data.history_store.cache.ttl = args.history_ttl
+    tool_pool.configure(args.tool_workers, args.tool_concurrency)
+
+    latencies, errors, lag = [], [], []
+    lag_task = asyncio.create_task(measure_loop_lag(lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(session(user_id, args.turns, latencies, errors) for user_id in range(1, args.sessions + 1)))
+    elapsed = time.perf_counter() - started
+    lag_task.cancel()
+
+    ms = np.array(latencies) * 1000
+    report = {
+        "sessions": args.sessions,
+        "turns": len(latencies),
+        "seconds": round(elapsed, 2),
+        "turns_per_sec": round(len(latencies) / elapsed, 1),
+        "turn_ms": {"p50": round(float(np.percentile(ms, 50)), 1), "p99": round(float(np.percentile(ms, 99)), 1)},
+        "loop_lag_ms_max": round(1000 * max(lag, default=0.0), 1),
+        "errors": len(errors),
+        "tools": tool_pool.stats(),
+        "history": market_data.history_store.stats(),
+        "memory": chat_agent.memory.stats(),
+    }
+    for key, value in report.items():
+        print(f"{key:>16}: {value}")
+    if errors:
+        print(f"first error: {errors[0]}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent chat sessions against stubbed backends")
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=3, help="Questions per session, asked one after another")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per model call")
+    parser.add_argument("--news-latency", type=float, default=0.5, help="Seconds per news search")
+    parser.add_argument("--market-latency", type=float, default=0.5, help="Seconds per (blocking) history download")
+    parser.add_argument("--news-share", type=float, default=0.3, help="Share of questions that ask for news")
+    parser.add_argument("--history-ttl", type=float, default=0.0, help="History cache TTL; 0 downloads on every miss")
+    parser.add_argument("--tool-workers", type=int, default=8)
+    parser.add_argument("--tool-concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
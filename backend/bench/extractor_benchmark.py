@@ -0,0 +1,67 @@
+"""
+Parses/sec of every price extractor on the saved quote pages.
+
+bench/fixtures/quotes holds canned Google Finance quote pages (same price markup and
+a comparable amount of inline script and style, 130-200 KB each) and prices.json with
+the price each one shows. Every extractor must return exactly that price on every page,
+otherwise the run fails before anything is timed.
+
+    python -m bench.extractor_benchmark
+    python -m bench.extractor_benchmark --seconds 2
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+from app.services.price_extractor import EXTRACTORS, build_extractor
+
+FIXTURES = Path(__file__).parent / "fixtures" / "quotes"
+
+def load_fixtures() -> dict:
+    """{file name: (html, expected price)}"""
+    prices = json.loads((FIXTURES / "prices.json").read_text())
+    return {name: ((FIXTURES / name).read_text(encoding="utf-8"), price) for name, price in prices.items()}
+
+def check(fixtures: dict) -> list:
+    """Every extractor, and the tiered default, against every page; returns the mismatches"""
+    extractors = {name: cls() for name, cls in EXTRACTORS.items()}
+    extractors["tiered"] = build_extractor()
+    mismatches = []
+    for page, (html, expected) in fixtures.items():
+        for name, extractor in extractors.items():
+            price = extractor.extract(html)
+            if price != expected:
+                mismatches.append(f"{name} on {page}: got {price}, expected {expected}")
+    return mismatches
+
+def parses_per_sec(extractor, pages: list, seconds: float) -> float:
+    parses = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < seconds:
+        for html in pages:
+            extractor.extract(html)
+        parses += len(pages)
+    return parses / (time.perf_counter() - started)
+
+def main(args):
+    fixtures = load_fixtures()
+    mismatches = check(fixtures)
+    if mismatches:
+        print("\n".join(mismatches))
+        sys.exit(1)
+    print(f"{len(EXTRACTORS)} extractors agree on {len(fixtures)} pages")
+
+    pages = [html for html, _ in fixtures.values()]
+    kb = sum(len(html.encode()) for html in pages) / len(pages) / 1024
+    print(f"avg page: {kb:.0f} KB")
+    results = {name: parses_per_sec(cls(), pages, args.seconds) for name, cls in EXTRACTORS.items()}
+    slowest = min(results.values())
+    for name, rate in results.items():
+        print(f"{name:>8}: {rate:10.1f} parses/s  ({rate / slowest:.0f}x)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price extractor correctness and parses/sec")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Timing budget per extractor")
+    main(parser.parse_args())
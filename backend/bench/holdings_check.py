@@ -0,0 +1,131 @@
+"""
+Consistency check of the in-memory holdings index after manual trades.
+
+Sends random /buy and /sell requests through the real /api/portfolio routes (bearer
+token auth included) against a local SQLite database, applies one price tick, then
+compares holdings_index with the Portfolio table: exactly one by_user entry per user
+with holdings, the same quantity and buy price per stock, and totals that value every
+holding at the tick's price. Exits non-zero on any mismatch.
+
+    python -m bench.holdings_check
+    python -m bench.holdings_check --users 20 --trades 500
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import argparse
+import asyncio
+import random
+import sys
+from datetime import timedelta
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import insert, select
+
+from app.api import portfolio
+from app.core.database import engine, SessionLocal
+from app.core.security import create_access_token
+from app.models.sql_models import Base, Portfolio, Stock, User
+from app.services import scraper_engine
+from app.services.holdings import holdings_index
+
+# buy_price is a 2-decimal column: the index keeps the unrounded average the write path computed
+PRICE_TOLERANCE = 0.01
+
+def same(a, b) -> bool:
+    """(quantity, buy_price) pairs, or None"""
+    if a is None or b is None:
+        return a is b
+    return a[0] == b[0] and abs(a[1] - b[1]) < PRICE_TOLERANCE
+
+def compare(rows: list, prices: dict) -> list:
+    """holdings_index against the Portfolio rows; returns the mismatches"""
+    expected = {}
+    for row in rows:
+        expected.setdefault(row.user_id, {})[row.stock_id] = (row.quantity, float(row.buy_price))
+
+    mismatches = []
+    # repr() so a '5' next to a 5 shows up as two entries
+    extra = [repr(u) for u in holdings_index.by_user if u not in expected]
+    missing = [repr(u) for u in expected if u not in holdings_index.by_user]
+    if extra:
+        mismatches.append(f"by_user entries with no Portfolio rows: {', '.join(extra)}")
+    if missing:
+        mismatches.append(f"users with Portfolio rows but no by_user entry: {', '.join(missing)}")
+
+    for user_id, holdings in expected.items():
+        indexed = holdings_index.by_user.get(user_id)
+        if indexed is None:
+            continue
+        if indexed.keys() != holdings.keys() or not all(same(indexed[sid], holdings[sid]) for sid in holdings):
+            mismatches.append(f"user {user_id}: index {indexed}, table {holdings}")
+        for stock_id, holding in holdings.items():
+            if not same(holdings_index.by_stock.get(stock_id, {}).get(user_id), holding):
+                mismatches.append(f"by_stock[{stock_id}][{user_id}] != {holding}")
+        totals = holdings_index.totals.get(user_id, {})
+        invested = sum(qty * buy for qty, buy in holdings.values())
+        current = sum(qty * prices.get(sid, buy) for sid, (qty, buy) in holdings.items())
+        quantity = sum(qty for qty, _ in holdings.values())
+        if abs(totals.get("invested", 0.0) - invested) > quantity * PRICE_TOLERANCE \
+                or abs(totals.get("current_value", 0.0) - current) > quantity * PRICE_TOLERANCE:
+            mismatches.append(f"user {user_id}: totals {totals}, table invested {invested} current {current}")
+    return mismatches
+
+async def main(args):
+    rng = random.Random(args.seed)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    user_ids = list(range(1, args.users + 1))
+    stock_ids = list(range(1, args.stocks + 1))
+    async with SessionLocal() as db:
+        await db.execute(insert(User), [{"user_id": u, "name": f"u{u}", "email": f"u{u}@bench", "password_hash": "-"} for u in user_ids])
+        await db.execute(insert(Stock), [{"stock_id": s, "name": f"S{s}", "full_name": f"S{s}"} for s in stock_ids])
+        await db.commit()
+        await holdings_index.load(db)
+
+    app = FastAPI()
+    app.include_router(portfolio.router, prefix="/api/portfolio")
+    tokens = {u: create_access_token({"sub": str(u)}, timedelta(minutes=30)) for u in user_ids}
+    held = {}
+    buys = sells = 0
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(args.trades):
+            user_id = rng.choice(user_ids)
+            headers = {"Authorization": f"Bearer {tokens[user_id]}"}
+            owned = [sid for (u, sid), qty in held.items() if u == user_id and qty > 0]
+            if owned and rng.random() < 0.3:
+                stock_id = rng.choice(owned)
+                quantity = rng.randint(1, held[user_id, stock_id])
+                path, sells = "/api/portfolio/sell", sells + 1
+                held[user_id, stock_id] -= quantity
+            else:
+                stock_id, quantity = rng.choice(stock_ids), rng.randint(1, 20)
+                path, buys = "/api/portfolio/buy", buys + 1
+                held[user_id, stock_id] = held.get((user_id, stock_id), 0) + quantity
+            r = await client.post(path, json={"stock_id": stock_id, "quantity": quantity, "price": round(rng.uniform(10, 500), 2)}, headers=headers)
+            r.raise_for_status()
+
+    prices = {sid: round(rng.uniform(10, 500), 2) for sid in stock_ids}
+    await scraper_engine.push_portfolio_updates({sid: {"stock_id": sid, "price": price} for sid, price in prices.items()})
+
+    async with SessionLocal() as db:
+        rows = (await db.execute(select(Portfolio))).scalars().all()
+    await engine.dispose()
+
+    mismatches = compare(rows, prices)
+    print(f"{buys} buys, {sells} sells by {args.users} users over {args.stocks} stocks, then one tick")
+    print(f"  portfolio rows : {len(rows)}")
+    print(f"  by_user entries: {len(holdings_index.by_user)} for {len({row.user_id for row in rows})} users with holdings")
+    print(f"  mismatches     : {len(mismatches)}")
+    if mismatches:
+        print("\n".join(mismatches))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Holdings index vs Portfolio table after manual trades")
+    parser.add_argument("--users", type=int, default=5)
+    parser.add_argument("--stocks", type=int, default=10)
+    parser.add_argument("--trades", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,111 @@
+"""
+Login throughput and event loop lag under a burst of concurrent logins.
+
+Seeds an in-memory SQLite database with users and fires --logins concurrent logins
+through verify_user_login, either with argon2 on the hashing pool (the default) or
+inline on the event loop as it used to run (--inline). A ticker measures how late
+the loop wakes up while the burst is in progress, which is what the scraper loop and
+the WebSockets feel.
+
+    python -m bench.login_benchmark --logins 200
+    python -m bench.login_benchmark --logins 200 --inline
+"""
+import os
+
+REPLAY_DB_URL = "sqlite+aiosqlite:///:memory:"
+os.environ.setdefault("DATABASE_URL", REPLAY_DB_URL)
+
+import argparse
+import asyncio
+import time
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.core.security import hash_password, verify_password_hash, hashing_pool, HashingOverloaded
+from app.crud import user as user_crud
+from app.models.sql_models import Base, User
+
+PASSWORD = "correct horse battery staple"
+
+async def setup_database(users: int):
+    engine = create_async_engine(REPLAY_DB_URL)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # One hash for everyone: seeding should not take longer than the benchmark
+    hashed = hash_password(PASSWORD)
+    async with session_factory() as db:
+        await db.execute(insert(User), [
+            {"user_id": i, "name": f"user{i}", "email": f"user{i}@example.com", "password_hash": hashed}
+            for i in range(1, users + 1)
+        ])
+        await db.commit()
+    return engine, session_factory
+
+async def inline_login(db, user_id: int):
+    """The old path: argon2 runs on the event loop"""
+    user = await user_crud.get_user_by_id(db, user_id)
+    return user if verify_password_hash(PASSWORD, user.password_hash) else None
+
+async def measure_loop_lag(samples: list, interval: float = 0.01):
+    while True:
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        samples.append(time.perf_counter() - started - interval)
+
+async def main(args):
+    engine, session_factory = await setup_database(args.users)
+    hashing_pool.workers = args.workers
+    hashing_pool.max_pending = args.max_pending
+
+    lag, latencies = [], []
+    outcomes = {"ok": 0, "shed": 0, "failed": 0}
+
+    async def login(i: int):
+        started = time.perf_counter()
+        async with session_factory() as db:
+            try:
+                if args.inline:
+                    user = await inline_login(db, i % args.users + 1)
+                else:
+                    user = await user_crud.verify_user_login(db, str(i % args.users + 1), PASSWORD)
+                outcomes["ok" if user else "failed"] += 1
+            except HashingOverloaded:
+                outcomes["shed"] += 1
+        latencies.append(time.perf_counter() - started)
+
+    if not args.inline:
+        # Start the workers before timing, as a running server would have them warm
+        await hashing_pool.hash("warm-up")
+
+    lag_task = asyncio.create_task(measure_loop_lag(lag))
+    started = time.perf_counter()
+    await asyncio.gather(*(login(i) for i in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    lag_task.cancel()
+    hashing_pool.shutdown()
+    await engine.dispose()
+
+    ms = np.array(latencies) * 1000
+    lag_ms = np.array(lag or [0.0]) * 1000
+    report = {
+        "mode": "inline" if args.inline else f"pool ({args.workers} workers, {args.max_pending} pending)",
+        "logins": args.logins,
+        **outcomes,
+        "seconds": round(elapsed, 2),
+        "logins_per_sec": round(outcomes["ok"] / elapsed, 1),
+        "login_ms": {"p50": round(float(np.percentile(ms, 50)), 1), "p99": round(float(np.percentile(ms, 99)), 1)},
+        "loop_lag_ms": {"p99": round(float(np.percentile(lag_ms, 99)), 1), "max": round(float(lag_ms.max()), 1)},
+    }
+    for key, value in report.items():
+        print(f"{key:>15}: {value}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent login benchmark")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--inline", action="store_true", help="Hash on the event loop, as before the pool")
+    parser.add_argument("--workers", type=int, default=hashing_pool.workers)
+    parser.add_argument("--max-pending", type=int, default=hashing_pool.max_pending)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,102 @@
+"""
+Trigger matching cost per tick against the number of resting orders.
+
+Spreads N pending orders over --stocks stocks (buys below the market, sells above it,
+within 5%) and moves every price a little each tick, so only orders near the market
+fire. Compares the price-indexed OrderBook with the linear scan it replaced, which
+checked every pending order of a stock on every tick. Fired orders are re-placed at a
+new target so N stays constant.
+
+    python -m bench.order_book_benchmark
+    python -m bench.order_book_benchmark --sizes 1000,10000 --ticks 200
+"""
+import argparse
+import itertools
+import random
+import time
+
+from app.services.order_book import OrderBook
+
+class Order:
+    """The OrderTrigger fields matching reads"""
+    __slots__ = ("trigger_id", "stock_id", "order_type", "target_price")
+
+    def __init__(self, trigger_id: int, stock_id: int, order_type: str, target_price: float):
+        self.trigger_id = trigger_id
+        self.stock_id = stock_id
+        self.order_type = order_type
+        self.target_price = target_price
+
+def place(rng: random.Random, ids, stock_id: int, price: float) -> Order:
+    if rng.random() < 0.5:
+        return Order(next(ids), stock_id, "B", price * (1 - rng.uniform(0, 0.05)))
+    return Order(next(ids), stock_id, "S", price * (1 + rng.uniform(0, 0.05)))
+
+def linear_match(orders: list, price: float) -> list:
+    """The old matching: every pending order of the stock is checked"""
+    fired = [
+        order for order in orders
+        if (order.order_type == "B" and price <= order.target_price)
+        or (order.order_type == "S" and price >= order.target_price)
+    ]
+    for order in fired:
+        orders.remove(order)
+    return fired
+
+def run(size: int, stocks: int, ticks: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    ids = itertools.count(1)
+    prices = {sid: rng.uniform(100, 3000) for sid in range(1, stocks + 1)}
+    lists = {sid: [] for sid in prices}
+    books = {sid: OrderBook() for sid in prices}
+    for _ in range(size):
+        sid = rng.randint(1, stocks)
+        order = place(rng, ids, sid, prices[sid])
+        lists[sid].append(order)
+        books[sid].add(order)
+
+    linear_seconds = book_seconds = 0.0
+    fired_total = 0
+    for _ in range(ticks):
+        for sid in prices:
+            prices[sid] *= 1 + rng.gauss(0, 0.002)
+        # Both sides fire the same orders; each re-places its own copies
+        replacements = {}
+        started = time.perf_counter()
+        for sid, price in prices.items():
+            for order in linear_match(lists[sid], price):
+                replacements.setdefault(order.trigger_id, place(rng, ids, sid, price))
+                lists[sid].append(replacements[order.trigger_id])
+        linear_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        for sid, price in prices.items():
+            fired = books[sid].match(price)
+            fired_total += len(fired)
+            for order in fired:
+                books[sid].add(replacements[order.trigger_id])
+        book_seconds += time.perf_counter() - started
+
+    return {
+        "orders": size,
+        "fired_per_tick": fired_total / ticks,
+        "linear_us": 1e6 * linear_seconds / ticks,
+        "book_us": 1e6 * book_seconds / ticks,
+    }
+
+def main(args):
+    print(f"{args.stocks} stocks, {args.ticks} ticks per size")
+    for size in (int(s) for s in args.sizes.split(",")):
+        r = run(size, args.stocks, args.ticks, args.seed)
+        print(
+            f"{r['orders']:>9} orders: linear {r['linear_us']:10.1f} us/tick  book {r['book_us']:8.1f} us/tick  "
+            f"({r['linear_us'] / r['book_us']:6.1f}x)  fired {r['fired_per_tick']:.1f}/tick"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OrderBook vs linear trigger matching")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--stocks", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
@@ -0,0 +1,66 @@
+"""
+Local stand-in for the Google Finance quote pages, for offline scraper benchmarks.
+
+Serves GET /finance/quote/{TICKER}:NSE from a canned page in bench/fixtures/quotes with
+the price swapped for one derived from the ticker, so every symbol parses to a
+different, stable price. --latency delays every response like a network round trip, and
+--handshake delays the first request on each new connection, standing in for the TCP +
+TLS setup a fresh connection to google.com costs.
+
+    python -m bench.quote_server --port 8800 --latency 0.05 --handshake 0.1
+    SCRAPER_BASE_URL=http://127.0.0.1:8800/finance/quote uvicorn main:app
+"""
+import argparse
+import asyncio
+import zlib
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, PlainTextResponse
+from starlette.routing import Route
+
+from bench.extractor_benchmark import load_fixtures
+
+TEMPLATE_PAGE = "RELIANCE.html"
+
+def quote_price(ticker: str) -> float:
+    return round(50 + zlib.crc32(ticker.encode()) % 500000 / 100, 2)
+
+def build_app(latency: float, handshake: float) -> Starlette:
+    html, price = load_fixtures()[TEMPLATE_PAGE]
+    marker = f"₹{price:,.2f}"
+    head, tail = html.split(marker, 1)
+    # (client host, port) pairs seen so far: one per keep-alive connection
+    connections = set()
+
+    async def quote(request: Request):
+        symbol = request.path_params["symbol"]
+        ticker, _, exchange = symbol.partition(":")
+        if exchange != "NSE" or not ticker:
+            return PlainTextResponse("Not found", status_code=404)
+
+        delay = latency
+        if request.client is not None and tuple(request.client) not in connections:
+            connections.add(tuple(request.client))
+            delay += handshake
+        if delay:
+            await asyncio.sleep(delay)
+        return HTMLResponse(f"{head}₹{quote_price(ticker):,.2f}{tail}")
+
+    async def stats(request: Request):
+        return PlainTextResponse(f"connections={len(connections)}")
+
+    return Starlette(routes=[
+        Route("/finance/quote/{symbol}", quote),
+        Route("/stats", stats),
+    ])
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Canned quote pages over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every response")
+    parser.add_argument("--handshake", type=float, default=0.1, help="Extra seconds on a connection's first request")
+    args = parser.parse_args()
+    uvicorn.run(build_app(args.latency, args.handshake), host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,170 @@
+"""
+Replay / backtest runner for the tick pipeline.
+
+Feeds a recorded tick log or a synthetic random walk through the same
+process_tick (day change -> triggers -> broadcast) that scraper_loop uses, against a
+local SQLite database, and reports throughput and per-stage latency.
+
+    python -m bench.replay --synthetic --ticks 2000 --orders 20000
+    python -m bench.replay --day 2026-10-16 --speed 60
+
+Needs the 'aiosqlite' driver for the default in-memory database.
+"""
+import os
+
+REPLAY_DB_URL = "sqlite+aiosqlite:///:memory:"
+# The shared engine in app.core.database must never point at TiDB during a replay
+os.environ.setdefault("DATABASE_URL", REPLAY_DB_URL)
+
+import argparse
+import asyncio
+import datetime
+import random
+import time
+import numpy as np
+from typing import Dict, Iterator, Tuple
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app.models.sql_models import Base, OrderTrigger, Portfolio
+from app.services import scraper_engine
+from app.services.tick_log import TickLogReader
+from app.services.trigger import initialize_trigger_cache
+from app.services.holdings import holdings_index
+
+STAGES = ("day_change", "triggers", "portfolio", "broadcast")
+
+# ------------------ PRICE PATHS ------------------
+def recorded_ticks(day: datetime.date) -> Iterator[Tuple[float, Dict[int, Dict]]]:
+    """Cycles from a day's tick log, shaped like fetch_all() output"""
+    for ts, records in TickLogReader(day).ticks():
+        yield ts, {
+            int(sid): {"stock_id": int(sid), "name": scraper_engine.ID_MAP_REVERSE.get(int(sid), str(sid)), "price": round(float(price), 2)}
+            for sid, price in zip(records["stock_id"], records["price"])
+        }
+
+def synthetic_ticks(start_prices: Dict[int, float], ticks: int, volatility: float = 0.001,
+                    interval: float = 2.0, seed: int = 7) -> Iterator[Tuple[float, Dict[int, Dict]]]:
+    """Deterministic geometric random walk per stock"""
+    rng = np.random.default_rng(seed)
+    sids = np.array(list(start_prices))
+    prices = np.array([start_prices[sid] for sid in sids], dtype=np.float64)
+    ts = time.time()
+    for _ in range(ticks):
+        prices *= np.exp(rng.normal(0.0, volatility, len(prices)))
+        ts += interval
+        yield ts, {
+            int(sid): {"stock_id": int(sid), "name": scraper_engine.ID_MAP_REVERSE.get(int(sid), str(sid)), "price": round(float(price), 2)}
+            for sid, price in zip(sids, prices)
+        }
+
+# ------------------ DATABASE STAND-IN ------------------
+async def setup_database(start_prices: Dict[int, float], orders: int, users: int, seed: int = 7):
+    """In-memory schema seeded with resting triggers around the start prices and holdings to sell from"""
+    engine = create_async_engine(REPLAY_DB_URL)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False, class_=AsyncSession)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    rng = random.Random(seed)
+    sids = list(start_prices)
+    triggers = []
+    for _ in range(orders):
+        sid = rng.choice(sids)
+        side = rng.choice("BS")
+        # Buys rest below the market, sells above it, within ~5%
+        offset = rng.uniform(0.0, 0.05) * (-1 if side == "B" else 1)
+        triggers.append({
+            "user_id": rng.randint(1, users), "stock_id": sid, "quantity": rng.randint(1, 10),
+            "target_price": round(start_prices[sid] * (1 + offset), 2), "order_type": side, "status": "P"
+        })
+    holdings = [
+        {"user_id": user_id, "stock_id": sid, "quantity": 1_000_000, "buy_price": start_prices[sid]}
+        for user_id in range(1, users + 1) for sid in sids
+    ]
+
+    async with session_factory() as db:
+        if triggers:
+            await db.execute(insert(OrderTrigger), triggers)
+        if holdings:
+            await db.execute(insert(Portfolio), holdings)
+        await db.commit()
+        await initialize_trigger_cache(db)
+        await holdings_index.load(db)
+
+    return engine, session_factory
+
+# ------------------ RUNNER ------------------
+async def run_replay(ticks: Iterator, prev_close: Dict[int, float], session_factory, speed: float = 0) -> dict:
+    """
+    Drives process_tick with each cycle. speed is the speed-up over recorded time
+    (60 = one minute of market per second); 0 runs as fast as possible.
+    """
+    latencies = {stage: [] for stage in STAGES}
+    fired = 0
+    count = 0
+    previous_ts = None
+
+    started = time.perf_counter()
+    for ts, prices in ticks:
+        if speed and previous_ts is not None:
+            await asyncio.sleep(max(0.0, (ts - previous_ts) / speed))
+        previous_ts = ts
+
+        timings = await scraper_engine.process_tick(prices, prev_close, ts, session_factory)
+        fired += timings.get("fired", 0)
+        for stage in STAGES:
+            if stage in timings:
+                latencies[stage].append(timings[stage])
+        count += 1
+    elapsed = time.perf_counter() - started
+
+    report = {
+        "ticks": count,
+        "seconds": round(elapsed, 3),
+        "ticks_per_sec": round(count / elapsed, 1) if elapsed else 0.0,
+        "orders_fired": fired,
+        "orders_fired_per_sec": round(fired / elapsed, 1) if elapsed else 0.0,
+    }
+    for stage, values in latencies.items():
+        if values:
+            ms = np.array(values) * 1000
+            report[f"{stage}_ms"] = {
+                "p50": round(float(np.percentile(ms, 50)), 3),
+                "p99": round(float(np.percentile(ms, 99)), 3),
+                "max": round(float(ms.max()), 3),
+            }
+    return report
+
+async def main(args):
+    if args.day:
+        ticks = recorded_ticks(datetime.date.fromisoformat(args.day))
+        first_ts, first = next(ticks)
+        start_prices = {sid: stock["price"] for sid, stock in first.items()}
+    else:
+        rng = random.Random(args.seed)
+        start_prices = {sid: round(rng.uniform(100, 5000), 2) for sid in range(1, args.stocks + 1)}
+        ticks = synthetic_ticks(start_prices, args.ticks, args.volatility, seed=args.seed)
+
+    engine, session_factory = await setup_database(start_prices, args.orders, args.users, args.seed)
+    try:
+        report = await run_replay(ticks, start_prices, session_factory, args.speed)
+    finally:
+        await engine.dispose()
+
+    for key, value in report.items():
+        print(f"{key:>22}: {value}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay prices through the trigger/broadcast pipeline")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--day", help="Replay the tick log of this date (YYYY-MM-DD)")
+    source.add_argument("--synthetic", action="store_true", help="Random-walk prices")
+    parser.add_argument("--ticks", type=int, default=1000, help="Synthetic cycles")
+    parser.add_argument("--stocks", type=int, default=len(scraper_engine.TICKERS), help="Synthetic universe size")
+    parser.add_argument("--volatility", type=float, default=0.001, help="Synthetic per-tick log-return stdev")
+    parser.add_argument("--orders", type=int, default=10000, help="Resting trigger orders to seed")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--speed", type=float, default=0, help="Speed-up factor, 0 = as fast as possible")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,117 @@
+"""
+Offline throughput of the scraper fetch path against the stand-in quote server.
+
+Starts bench.quote_server in a subprocess and runs full-universe fetch cycles two ways:
+
+  threads  the old path: requests.get on a 10-thread pool, a fresh connection per
+           quote, BeautifulSoup parse of every page
+  async    GoogleFinanceSource: one keep-alive httpx client, adaptive concurrency,
+           fast-path price extractor
+
+and reports cycle latency and quotes/sec for each.
+
+    python -m bench.scraper_throughput --tickers 50 --cycles 5
+    python -m bench.scraper_throughput --tickers 500 --latency 0.1 --handshake 0.2
+"""
+import os
+
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite:///:memory:")
+
+import argparse
+import asyncio
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import numpy as np
+import requests
+from bs4 import BeautifulSoup
+
+from app.services.price_extractor import PRICE_CLASS
+from app.services.price_sources import GoogleFinanceSource
+from bench.quote_server import quote_price
+
+OLD_WORKERS = 10
+
+def old_fetch_price(base_url: str, ticker: str) -> float | None:
+    """The scraper's fetch before the async client, kept here as the baseline"""
+    try:
+        r = requests.get(f"{base_url}/{ticker}:NSE", headers={"User-Agent": "Mozilla/5.0"}, timeout=5)
+        soup = BeautifulSoup(r.text, "html.parser")
+        tag = soup.find(class_=PRICE_CLASS)
+        if tag:
+            return float(tag.text.replace("₹", "").replace(",", ""))
+    except Exception:
+        return None
+    return None
+
+async def run_threads(base_url: str, tickers: list, cycles: int) -> tuple:
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=OLD_WORKERS)
+    durations, results = [], {}
+    for _ in range(cycles):
+        started = time.perf_counter()
+        prices = await asyncio.gather(*(loop.run_in_executor(executor, old_fetch_price, base_url, t) for t in tickers))
+        durations.append(time.perf_counter() - started)
+        results = {t: p for t, p in zip(tickers, prices) if p is not None}
+    executor.shutdown()
+    return durations, results
+
+async def run_async(base_url: str, tickers: list, cycles: int, concurrency: int) -> tuple:
+    source = GoogleFinanceSource(base_url=base_url, max_concurrency=concurrency, cycle_deadline=60)
+    durations, results = [], {}
+    for _ in range(cycles):
+        started = time.perf_counter()
+        results = await source.fetch(tickers)
+        durations.append(time.perf_counter() - started)
+    await source.close()
+    return durations, results
+
+async def wait_for_server(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("Quote server did not start")
+
+def report(mode: str, durations: list, results: dict, tickers: list):
+    ms = np.array(durations) * 1000
+    wrong = sum(1 for t in tickers if results.get(t) != quote_price(t))
+    print(
+        f"{mode:>8}: cycle p50 {np.percentile(ms, 50):8.1f} ms  max {ms.max():8.1f} ms  "
+        f"{len(tickers) / np.median(durations):8.1f} quotes/s  priced {len(results)}/{len(tickers)}  wrong {wrong}"
+    )
+
+async def main(args):
+    server = subprocess.Popen([
+        sys.executable, "-m", "bench.quote_server", "--port", str(args.port),
+        "--latency", str(args.latency), "--handshake", str(args.handshake)
+    ])
+    try:
+        await wait_for_server(f"http://127.0.0.1:{args.port}/stats")
+        base_url = f"http://127.0.0.1:{args.port}/finance/quote"
+        tickers = [f"T{i:04d}" for i in range(args.tickers)]
+        print(f"{args.tickers} tickers, {args.cycles} cycles, latency {args.latency}s, handshake {args.handshake}s")
+        if "threads" in args.modes:
+            report("threads", *await run_threads(base_url, tickers, args.cycles), tickers)
+        if "async" in args.modes:
+            report("async", *await run_async(base_url, tickers, args.cycles, args.concurrency), tickers)
+    finally:
+        server.terminate()
+        server.wait()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scraper fetch path against canned quote pages")
+    parser.add_argument("--tickers", type=int, default=50)
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.05, help="Server response delay (round trip)")
+    parser.add_argument("--handshake", type=float, default=0.1, help="Server delay on a new connection (TLS setup)")
+    parser.add_argument("--concurrency", type=int, default=32, help="Max in-flight requests for the async path")
+    parser.add_argument("--modes", default="threads,async")
+    parser.add_argument("--port", type=int, default=8800)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,71 @@
+"""
+Write/read micro-benchmark of the binary tick log.
+
+Writes a synthetic trading day (--stocks quotes every --interval seconds for a 6h15m
+session) into a temporary directory through TickLogWriter, then reads it back through
+TickLogReader: replay of every cycle, one ticker's day, and a 5-minute window.
+
+    python -m bench.tick_log_benchmark
+    python -m bench.tick_log_benchmark --stocks 2000 --interval 2
+"""
+import argparse
+import datetime
+import os
+import tempfile
+import time
+import numpy as np
+
+from app.services.tick_log import IST, RECORD_DTYPE, TickLogReader, TickLogWriter, log_path
+
+SESSION_SECONDS = 6 * 3600 + 15 * 60
+
+def main(args):
+    rng = np.random.default_rng(7)
+    day = datetime.date(2026, 10, 16)
+    start = datetime.datetime.combine(day, datetime.time(9, 15), IST).timestamp()
+    cycles = int(SESSION_SECONDS / args.interval)
+    sids = list(range(1, args.stocks + 1))
+    prices = rng.uniform(50, 5000, args.stocks)
+
+    with tempfile.TemporaryDirectory() as directory:
+        writer = TickLogWriter(directory, retention_days=0)
+        append_seconds = 0.0
+        started = time.perf_counter()
+        for cycle in range(cycles):
+            prices *= 1 + rng.normal(0, 0.0005, args.stocks)
+            quotes = {sid: {"price": float(price)} for sid, price in zip(sids, prices)}
+            # Only append() runs on the event loop; the write happens on the log thread
+            tick_started = time.perf_counter()
+            writer.append(quotes, start + cycle * args.interval)
+            append_seconds += time.perf_counter() - tick_started
+        writer.close()
+        write_seconds = time.perf_counter() - started
+        records = cycles * args.stocks
+        size = os.path.getsize(log_path(day, directory))
+
+        started = time.perf_counter()
+        reader = TickLogReader(day, directory)
+        replayed = sum(len(batch) for _, batch in reader.ticks())
+        replay_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        one = reader.ticker(args.stocks // 2)
+        ticker_seconds = time.perf_counter() - started
+
+        started = time.perf_counter()
+        window = reader.between(start + 3600, start + 3900)
+        window_seconds = time.perf_counter() - started
+        del reader
+
+    print(f"{cycles} cycles x {args.stocks} stocks = {records} records, {size / 1e6:.1f} MB ({RECORD_DTYPE.itemsize} B/record)")
+    print(f"  append on loop: {1e6 * append_seconds / cycles:8.1f} us/tick")
+    print(f"  end to end    : {records / write_seconds / 1e6:8.2f} M records/s")
+    print(f"  replay cycles : {replayed / replay_seconds / 1e6:8.2f} M records/s ({1e3 * replay_seconds:.0f} ms for the day)")
+    print(f"  one ticker    : {1e3 * ticker_seconds:8.2f} ms for {len(one)} records")
+    print(f"  5-min window  : {1e6 * window_seconds:8.1f} us for {len(window)} records (zero-copy view)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tick log write/read micro-benchmark")
+    parser.add_argument("--stocks", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=2.0, help="Seconds between cycles")
+    main(parser.parse_args())
@@ -0,0 +1,101 @@
+"""
+Size and encode time of every /ws/market wire format over a recorded trading day.
+
+Replays a day's tick log (TICK_LOG_DIR/ticks-YYYY-MM-DD.bin) through the same framing
+publish_market uses (deltas of changed stocks, a full keyframe every KEYFRAME_INTERVAL
+frames) and encodes each frame in every encoding with and without deflate. Bytes are
+what one dashboard client subscribed to "all" would receive for the day.
+
+The baseline is the frame sent before any of this: json.dumps of the full cache
+({"type": "update", "data": CACHE}) on every tick, plain and deflated. Every format is
+reported against it per tick (median frame) and per day (total bytes).
+
+    python -m bench.wire_benchmark --day 2026-10-16
+    python -m bench.wire_benchmark --day 2026-10-16 --log-dir /data/tick_logs --frames 2000
+"""
+import argparse
+import datetime
+import json
+import time
+import zlib
+import numpy as np
+
+from app.core.config import TICK_LOG_DIR
+from app.services.connection_manager import KEYFRAME_INTERVAL
+from app.services.tick_log import TickLogReader
+from app.services.wire_format import ENCODINGS, COMPRESSIONS, WireFormat
+
+def deflate(payload: bytes) -> bytes:
+    """Raw deflate stream, as WireFormat compresses"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, -zlib.MAX_WBITS)
+    return compressor.compress(payload) + compressor.flush()
+
+def snapshot_json(frame: dict) -> str:
+    return json.dumps(frame)
+
+def snapshot_json_deflate(frame: dict) -> bytes:
+    return deflate(json.dumps(frame).encode())
+
+BASELINES = {"snapshot json": snapshot_json, "snapshot json+deflate": snapshot_json_deflate}
+
+def day_frames(reader: TickLogReader, limit: int | None):
+    """
+    (baseline, market) frame pairs for an "all" subscriber: the full-cache frame the
+    scraper used to broadcast, and the frame publish_market builds now
+    """
+    published, prev_close = {}, {}
+    for seq, (_, records) in enumerate(reader.ticks(), start=1):
+        if limit and seq > limit:
+            return
+        changed = {}
+        for sid, price in zip(records["stock_id"].tolist(), records["price"].tolist()):
+            price = round(price, 2)
+            prev = prev_close.setdefault(sid, price)
+            stock = {
+                "stock_id": sid, "name": f"S{sid}", "price": price, "prev_close": prev,
+                "day_change": round((price - prev) / prev * 100, 2) if prev else 0.0,
+            }
+            if published.get(sid) != stock:
+                changed[sid] = published[sid] = stock
+        full = seq == 1 or seq % KEYFRAME_INTERVAL == 0
+        yield (
+            {"type": "update", "data": dict(published)},
+            {"type": "update", "seq": seq, "full": full, "dict": 1, "data": dict(published) if full else changed},
+        )
+
+def main(args):
+    reader = TickLogReader(datetime.date.fromisoformat(args.day), args.log_dir)
+    frames = list(day_frames(reader, args.frames))
+    print(f"{args.day}: {len(reader)} quotes, {len(frames)} frames")
+
+    def measure(name: str, encode, index: int):
+        sizes = []
+        started = time.perf_counter()
+        for pair in frames:
+            payload = encode(pair[index])
+            sizes.append(len(payload.encode() if isinstance(payload, str) else payload))
+        elapsed = time.perf_counter() - started
+        return name, np.array(sizes), elapsed
+
+    results = [measure(name, encode, 0) for name, encode in BASELINES.items()]
+    for encoding in ENCODINGS:
+        for compress in COMPRESSIONS:
+            wire = WireFormat(encoding, compress)
+            results.append(measure(f"{encoding}{'+' + compress if compress else ''}", wire.encode, 1))
+
+    _, baseline, _ = results[0]
+    day, tick = baseline.sum(), np.median(baseline)
+    print(f"{'':>21}  {'per day':>18}  {'per tick (median)':>20}")
+    for name, sizes, elapsed in results:
+        print(
+            f"{name:>21}: {sizes.sum() / 1e6:8.2f} MB {100 * sizes.sum() / day:6.1f}%  "
+            f"{np.median(sizes):8.0f} B {100 * np.median(sizes) / tick:6.1f}%  "
+            f"{1e6 * elapsed / len(frames):7.1f} us/frame"
+        )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wire format size/time over a recorded day")
+    parser.add_argument("--day", required=True, help="YYYY-MM-DD of a tick log")
+    parser.add_argument("--log-dir", default=TICK_LOG_DIR)
+    parser.add_argument("--frames", type=int, default=None, help="Stop after this many frames")
+    main(parser.parse_args())
@@ -0,0 +1,166 @@
+"""
+Fan-out load test for ConnectionManager.publish_market.
+
+Connects N in-process sockets: most read promptly, some are slow, and some are dead
+(sends and the closing handshake never return, like a mobile client that vanished).
+Publishes --ticks market ticks and reports how long publish_market holds the scraper
+tick, the tick-to-delivery latency (publish of a frame's seq until a socket's send of
+it returns; a conflated snapshot counts for the seq it was built at), and evictions.
+
+    python -m bench.ws_fanout --sockets 5000 --ticks 50
+    python -m bench.ws_fanout --sockets 5000 --dead-share 0.05 --max-lag 0.5
+"""
+import argparse
+import asyncio
+import random
+import time
+import numpy as np
+import orjson
+import ormsgpack
+
+from app.services import connection_manager
+from app.services.connection_manager import ConnectionManager
+from app.services.wire_format import WireFormat
+
+# ------------------ DELIVERY CLOCK ------------------
+class DeliveryClock:
+    """Publish time per seq, and the latency of every market frame a socket finished sending"""
+
+    def __init__(self):
+        self.published = {}
+        self.latencies = []
+        # id(payload) -> (payload, seq); payloads are shared by every socket of a group,
+        # so each is decoded once. Holding the payload keeps its id from being reused.
+        self._seqs = {}
+
+    def seq_of(self, payload) -> int | None:
+        entry = self._seqs.get(id(payload))
+        if entry is None or entry[0] is not payload:
+            frame = orjson.loads(payload) if isinstance(payload, str) else ormsgpack.unpackb(payload, option=ormsgpack.OPT_NON_STR_KEYS)
+            seq = frame.get("seq") if frame.get("type") == "update" else None
+            entry = self._seqs[id(payload)] = (payload, seq)
+        return entry[1]
+
+    def delivered(self, payload):
+        seq = self.seq_of(payload)
+        if seq in self.published:
+            self.latencies.append(time.perf_counter() - self.published[seq])
+
+# ------------------ STUB SOCKETS ------------------
+class StubSocket:
+    """Just enough of starlette's WebSocket for the manager"""
+
+    def __init__(self, clock: DeliveryClock, latency: float, dead: bool):
+        self.clock = clock
+        self.latency = latency
+        self.dead = dead
+        self.frames = 0
+
+    async def accept(self):
+        pass
+
+    async def _send(self, payload):
+        if self.dead:
+            await asyncio.Event().wait()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.frames += 1
+        self.clock.delivered(payload)
+
+    async def send_text(self, payload: str):
+        await self._send(payload)
+
+    async def send_bytes(self, payload: bytes):
+        await self._send(payload)
+
+    async def close(self, code: int = 1000):
+        if self.dead:
+            # The peer never answers the closing handshake
+            await asyncio.Event().wait()
+
+# ------------------ RUNNER ------------------
+def market_tick(rng: random.Random, stocks: int, changed_share: float, prices: dict) -> dict:
+    for sid in rng.sample(range(1, stocks + 1), int(stocks * changed_share)):
+        prices[sid] = round(prices.get(sid, 100.0) * (1 + rng.uniform(-0.002, 0.002)), 2)
+    return {
+        sid: {"name": f"STOCK{sid}", "price": price, "prev_close": 100.0, "day_change": round(price - 100.0, 2)}
+        for sid, price in prices.items()
+    }
+
+async def main(args):
+    rng = random.Random(args.seed)
+    connection_manager.MAX_LAG_SECONDS = args.max_lag
+    manager = ConnectionManager()
+    encodings = [WireFormat("json"), WireFormat("msgpack"), WireFormat("columnar")]
+    clock = DeliveryClock()
+
+    sockets = []
+    for i in range(args.sockets):
+        roll = rng.random()
+        socket = StubSocket(
+            clock,
+            latency=args.slow_latency if roll < args.slow_share else 0.0,
+            dead=args.slow_share <= roll < args.slow_share + args.dead_share
+        )
+        sockets.append(socket)
+        await manager.connect(socket, None, encodings[i % len(encodings)])
+        if rng.random() < args.subscriber_share:
+            manager.handle_message(socket, {"type": "subscribe", "stock_ids": rng.sample(range(1, args.stocks + 1), 5)})
+
+    prices = {}
+    publish = []
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        data = market_tick(rng, args.stocks, args.changed_share, prices)
+        tick_started = clock.published[manager.seq + 1] = time.perf_counter()
+        await manager.publish_market(data)
+        publish.append(time.perf_counter() - tick_started)
+        await asyncio.sleep(args.interval)
+    # Let the writers drain what is still queued before measuring
+    await asyncio.sleep(args.drain)
+    elapsed = time.perf_counter() - started
+
+    ms = np.array(publish) * 1000
+    delivery = np.array(clock.latencies) * 1000
+    stats = manager.stats()
+    report = {
+        "sockets": args.sockets,
+        "ticks": args.ticks,
+        "seconds": round(elapsed, 2),
+        "publish_ms": {
+            "p50": round(float(np.percentile(ms, 50)), 2),
+            "p99": round(float(np.percentile(ms, 99)), 2),
+            "max": round(float(ms.max()), 2),
+        },
+        "delivery_ms": {
+            "p50": round(float(np.percentile(delivery, 50)), 2),
+            "p99": round(float(np.percentile(delivery, 99)), 2),
+            "max": round(float(delivery.max()), 2),
+        },
+        "frames_delivered": sum(s.frames for s in sockets),
+        "evicted": stats["evicted"],
+        "manager": stats,
+    }
+    for key, value in report.items():
+        print(f"{key:>17}: {value}")
+
+    for connection in list(manager.active_connections.values()):
+        connection.stop()
+    for task in list(manager._closing):
+        task.cancel()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="publish_market fan-out to many in-process sockets")
+    parser.add_argument("--sockets", type=int, default=5000)
+    parser.add_argument("--stocks", type=int, default=500)
+    parser.add_argument("--ticks", type=int, default=50)
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between ticks")
+    parser.add_argument("--changed-share", type=float, default=0.3, help="Share of stocks that move per tick")
+    parser.add_argument("--subscriber-share", type=float, default=0.5, help="Share of sockets on a 5-stock watchlist")
+    parser.add_argument("--slow-share", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=0.2, help="Seconds per send for slow sockets")
+    parser.add_argument("--dead-share", type=float, default=0.01, help="Sockets whose sends and close never return")
+    parser.add_argument("--max-lag", type=float, default=1.0, help="Eviction threshold (MAX_LAG_SECONDS)")
+    parser.add_argument("--drain", type=float, default=1.0, help="Seconds to keep delivering after the last tick")
+    parser.add_argument("--seed", type=int, default=7)
+    asyncio.run(main(parser.parse_args()))
@@ -7,7 +7,12 @@ from app.core.database import engine, SessionLocal
 from app.models.sql_models import Base
 from app.services import scraper_engine as scraper_service 
 from app.services.trigger import initialize_trigger_cache
-from app.api import auth, portfolio, scraper, chat
+from app.services.tick_log import tick_log
+from app.services.holdings import holdings_index
+from app.services import chat_agent
+from app.services.tool_pool import tool_pool
+from app.core.security import hashing_pool
+from app.api import auth, portfolio, scraper, chat, market
 # --- Lifecycle Manager ---
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -16,7 +21,10 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
 
     async with SessionLocal() as db:
+        await scraper_service.load_universe(db)
         await initialize_trigger_cache(db)
+        await holdings_index.load(db)
+    await chat_agent.init_memory()
     
     # 2. Start the Scraper Loop
     scraper_service.SCRAPER_RUNNING = True
@@ -26,6 +34,12 @@ async def lifespan(app: FastAPI):
     
     # 3. Cleanup
     scraper_service.SCRAPER_RUNNING = False
+    await scraper_service.close_price_source()
+    await chat_agent.close_memory()
+    tool_pool.shutdown()
+    hashing_pool.shutdown()
+    if tick_log is not None:
+        tick_log.close()
     await engine.dispose()
 
 app = FastAPI(title="Stock Platform API", lifespan=lifespan)
@@ -45,6 +59,7 @@ app.include_router(portfolio.router, prefix="/api/portfolio", tags=["Portfolio"]
 # app.include_router(portfolio.router, tags=["PortfolioWS"]) 
 app.include_router(scraper.router, prefix="/api/scraper", tags=["Scraper"])
 app.include_router(chat.router,prefix="/api", tags=["Chatbot"])
+app.include_router(market.router, prefix="/api/market", tags=["Market"])
 
 @app.get("/")
 def read_root():